@@ -3,7 +3,6 @@ Tic Tac Toe Player
 """
 
 import math
-from copy import deepcopy
 
 X = "X"
 O = "O"
@@ -12,33 +11,125 @@ size_row = 3
 size_col = 3
 
 
+# Indices into GameState.lines: rows 0-2, columns 3-5, then both diagonals
+LINES_THROUGH = {
+    (row, col): tuple(
+        [row, size_row + col]
+        + ([6] if row == col else [])
+        + ([7] if row + col == size_col - 1 else [])
+    )
+    for row in range(size_row)
+    for col in range(size_col)
+}
+
+
+class GameState():
+    """
+    Incremental Tic Tac Toe game state.
+
+    Alongside the board it keeps the move count and one counter per row,
+    column and diagonal (+1 for every X, -1 for every O), so a win or a
+    draw is decided from the last move played instead of by rescanning
+    the whole board.
+    """
+
+    def __init__(self, board=None):
+        self.board = [[EMPTY, EMPTY, EMPTY],
+                      [EMPTY, EMPTY, EMPTY],
+                      [EMPTY, EMPTY, EMPTY]]
+        self.moves = 0
+        self.lines = [0] * 8
+        self.winner = None
+
+        # Replay an existing board cell by cell
+        if board is not None:
+            for row in range(size_row):
+                for col in range(size_col):
+                    if board[row][col] != EMPTY:
+                        self.place((row, col), board[row][col])
+
+    def __getitem__(self, row):
+        return self.board[row]
+
+    def __iter__(self):
+        return iter(self.board)
+
+    def __len__(self):
+        return len(self.board)
+
+    def __eq__(self, other):
+        if isinstance(other, GameState):
+            return self.board == other.board
+        return self.board == other
+
+    def __repr__(self):
+        return f"GameState({self.board})"
+
+    def player(self):
+        """
+        Returns player who has the next turn.
+        """
+        return X if self.moves % 2 == 0 else O
+
+    def terminal(self):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.winner is not None or self.moves == size_row * size_col
+
+    def place(self, action, mark):
+        """
+        Puts `mark` on the cell `action` and updates the counters of the
+        lines going through it.
+        """
+        row, col = action
+        if self.board[row][col] != EMPTY:
+            raise NotImplementedError
+        self.board[row][col] = mark
+        self.moves += 1
+
+        step = 1 if mark == X else -1
+        for line in LINES_THROUGH[action]:
+            self.lines[line] += step
+            # Only lines through the last move can have just been completed
+            if self.lines[line] == 3 * step:
+                self.winner = mark
+
+    def play(self, action):
+        """
+        Returns the state that results from the player to move
+        making move (i, j), leaving this state untouched.
+        """
+        state = GameState.__new__(GameState)
+        state.board = [list(row) for row in self.board]
+        state.moves = self.moves
+        state.lines = list(self.lines)
+        state.winner = self.winner
+        state.place(action, self.player())
+        return state
+
+
+def game_state(board):
+    """
+    Returns `board` as a GameState, building one if given a plain board.
+    """
+    if isinstance(board, GameState):
+        return board
+    return GameState(board)
+
+
 def initial_state():
     """
-    Returns starting state of the  .
+    Returns starting state of the game.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return GameState()
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    player_x_count = 0
-    player_o_count = 0
-
-    for row in board:
-        for col in row:
-            if col == X:
-                player_x_count += 1
-            elif col == O:
-                player_o_count += 1
-
-    if player_x_count <= player_o_count:
-        return X
-    else:
-        return O
+    return game_state(board).player()
 
 
 def actions(board):
@@ -61,63 +152,31 @@ def result(board, action):
     if action[0] not in [0, 1, 2] or action[1] not in [0, 1, 2]:
         raise NotImplementedError
 
-    board_copy = deepcopy(board)
-    board_copy[action[0]][action[1]] = player(board)
-    return board_copy
+    return game_state(board).play(action)
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    # row win:
-    for row in board:
-        if row.count(X) == 3:
-            return X
-        elif row.count(O) == 3:
-            return O
-
-    # col win:
-    for col in range(size_col):
-        res = ""
-        for row in range(size_row):
-            res += str(board[row][col])
-        if res == "XXX":
-            return X
-        if res == "OOO":
-            return O
-
-    # Diagonals
-    if board[0][0] == board[1][1] == board[2][2] == X:
-        return X
-    elif board[0][0] == board[1][1] == board[2][2] == O:
-        return O
-    elif board[0][2] == board[1][1] == board[2][0] == X:
-        return X
-    elif board[0][2] == board[1][1] == board[2][0] == O:
-        return O
-
-    # Otherwise no current winner, return None
-    return None
+    return game_state(board).winner
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) or not actions(board):
-        return True
-    else:
-        return False
+    return game_state(board).terminal()
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    win = winner(board)
+    if win == X:
         return 1
-    elif winner(board) == O:
+    elif win == O:
         return -1
     else:
         return 0
@@ -1,5 +1,15 @@
 import itertools
+import math
 import random
+import time
+
+# Seconds make_random_move may spend counting and sampling mine configurations
+PROBABILITY_SECONDS = 0.5
+
+# Configurations sampled from components too large to count in time,
+# and the most cells assigned while searching for each sample
+SAMPLES = 200
+SAMPLE_NODES = 10000
 
 
 class Minesweeper():
@@ -12,27 +22,51 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Cell (i, j) is at index i * width + j of the flat board, which
+        # holds 1 for a mine and 0 otherwise
+        self.board = bytearray(height * width)
 
         # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.mines = set()
+        for index in random.sample(range(height * width), mines):
+            self.board[index] = 1
+            self.mines.add(divmod(index, width))
+
+        # Count the mines next to each cell once
+        self.counts = self.count_nearby()
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    def count_nearby(self):
+        """
+        Returns the flat board of nearby mine counts, computed as the sum
+        of the board shifted one cell in each direction. Cell k is held in
+        the hexadecimal digit k of an int, so each shift and sum runs over
+        the whole board at once.
+        """
+        cells = self.height * self.width
+        if not cells:
+            return bytearray()
+        digits = bytes.maketrans(bytes(range(16)), b"0123456789abcdef")
+        board = int(self.board.translate(digits)[::-1], 16)
+
+        # Shift by one column, dropping cells that wrap around a row
+        not_first = int(("f" * (self.width - 1) + "0") * self.height, 16)
+        not_last = int(("0" + "f" * (self.width - 1)) * self.height, 16)
+        rows = board + ((board << 4) & not_first) + ((board >> 4) & not_last)
+
+        # Shift by one row, dropping cells past the last row
+        row = 4 * self.width
+        total = rows + (rows >> row) + ((rows << row) & ((1 << 4 * cells) - 1))
+
+        # Counts are at most 9 with the cell itself, so digits never carry
+        counts = format(total - board, f"0{cells}x")[::-1]
+        return bytearray(counts.encode().translate(bytes.maketrans(
+            b"0123456789", bytes(range(10))
+        )))
+
     def print(self):
         """
         Prints a text-based representation
@@ -41,7 +75,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +84,20 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i * self.width + j])
+
+    def neighbors(self, cell):
+        """
+        Returns the cells within one row and column of a given cell,
+        not including the cell itself, that are on the board.
+        """
+        i, j = cell
+        return [
+            (k, l)
+            for k in range(max(i - 1, 0), min(i + 2, self.height))
+            for l in range(max(j - 1, 0), min(j + 2, self.width))
+            if (k, l) != cell
+        ]
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +105,25 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return self.counts[i * self.width + j]
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Returns a list of (cell, nearby mines) for a safe cell and, when no
+        mines are nearby, every cell reached through neighbors that also
+        have no mines nearby, as found by breadth-first search.
+        """
+        revealed = [(cell, self.nearby_mines(cell))]
+        seen = {cell}
+        for cell, count in revealed:
+            if count:
+                continue
+            for neighbor in self.neighbors(cell):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    revealed.append((neighbor, self.nearby_mines(neighbor)))
+        return revealed
 
     def won(self):
         """
@@ -101,6 +149,31 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable key, equal for equal sentences.
+        """
+        return frozenset(self.cells), self.count
+
+    def members(self):
+        """
+        Returns the cells of the sentence, as MinesweeperAI.index knows them.
+        """
+        return self.cells
+
+    def issubset(self, other):
+        """
+        Returns whether every cell of this sentence is in `other`.
+        """
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence not in
+        `other`, where `other` is a subset of this sentence.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -135,17 +208,242 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Sentence whose cells are the bits of an int, which
+    MinesweeperAI(bitset=True) builds instead of a Sentence. Its cells
+    lie within three adjacent columns, as the neighbors of a cell do.
+    Bit r * STRIDE + c of `mask` stands for the cell r rows below and
+    c - SPREAD columns right of the sentence's first cell (`row`,
+    `column`), so masks stay a few dozen bits long however wide the
+    board is.
+    """
+
+    # Bits per row of a mask, and the column of the first cell within
+    # them. Cells of a sentence starting up to two columns either side
+    # of another's first cell still fall within the other's rows.
+    STRIDE = 9
+    SPREAD = 4
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.count = count
+        row, column = min(cells, default=(0, 0))
+        first = column - self.SPREAD
+        mask = used = 0
+        for i, j in cells:
+            mask |= 1 << ((i - row) * self.STRIDE + j - first)
+            used |= 1 << (j - first)
+        if used >> (used & -used).bit_length() + 2:
+            raise ValueError("cells must lie within three adjacent columns")
+        self.row = row
+        self.column = column
+        self.mask = mask
+
+        # Numbers of the cells, once members() has listed them
+        self.numbers = None
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    @property
+    def cells(self):
+        """
+        Returns the set of cells in the sentence.
+        """
+        return {divmod(number, self.width) for number in self.members()}
+
+    def members(self):
+        """
+        Returns the list of numbers i * width + j of the cells (i, j) in
+        the sentence, as MinesweeperAI.index knows them, one row of the
+        mask at a time.
+        """
+        if self.numbers is None:
+            self.numbers = []
+            mask = self.mask
+            number = self.row * self.width + self.column - self.SPREAD
+            while mask:
+                for column in ROW_COLUMNS[mask & ROW_MASK]:
+                    self.numbers.append(number + column)
+                mask >>= self.STRIDE
+                number += self.width
+        return self.numbers
+
+    def key(self):
+        """
+        Returns a hashable key, equal for equal sentences.
+        """
+        return self.row, self.column, self.mask, self.count
+
+    def bit(self, cell):
+        """
+        Returns the bit of the mask standing for a cell, or None if the
+        cell falls outside the rows of the mask.
+        """
+        i, j = cell
+        column = j - self.column + self.SPREAD
+        if i < self.row or not 0 <= column < self.STRIDE:
+            return None
+        return (i - self.row) * self.STRIDE + column
+
+    def forget(self, cell):
+        """
+        Removes a cell taken out of the mask from the listed numbers.
+        """
+        if self.numbers is not None:
+            self.numbers.remove(cell[0] * self.width + cell[1])
+
+    def normalize(self):
+        """
+        Shifts the mask so that its first cell is the sentence's first cell.
+        """
+        if self.mask and not self.mask >> self.SPREAD & 1:
+            low = (self.mask & -self.mask).bit_length() - 1
+            rows, column = divmod(low, self.STRIDE)
+            self.mask >>= low - self.SPREAD
+            self.row += rows
+            self.column += column - self.SPREAD
+
+    def issubset(self, other):
+        """
+        Returns whether every cell of this sentence is in `other`.
+        """
+        if not self.mask:
+            return True
+        rows = self.row - other.row
+        columns = self.column - other.column
+        if rows < 0 or (rows == 0 and columns < 0) or not -2 <= columns <= 2:
+            return False
+        mask = self.mask << (rows * self.STRIDE + columns)
+        return mask & ~other.mask == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of this sentence not in
+        `other`, where `other` is a subset of this sentence.
+        """
+        sentence = BitSentence((), self.count - other.count, self.width)
+        sentence.row = self.row
+        sentence.column = self.column
+        sentence.mask = self.mask
+        sentence.numbers = None
+        if other.mask:
+            shift = (other.row - self.row) * self.STRIDE + other.column - self.column
+            sentence.mask &= ~(other.mask << shift)
+            sentence.normalize()
+        return sentence
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if bin(self.mask).count("1") == self.count and self.count:
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if bit is not None and self.mask >> bit & 1:
+            self.mask ^= 1 << bit
+            self.count -= 1
+            self.forget(cell)
+            self.normalize()
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        bit = self.bit(cell)
+        if bit is not None and self.mask >> bit & 1:
+            self.mask ^= 1 << bit
+            self.forget(cell)
+            self.normalize()
+
+
+# The bits of one row of a BitSentence mask, and the columns they stand for
+ROW_MASK = (1 << BitSentence.STRIDE) - 1
+ROW_COLUMNS = [
+    [column for column in range(BitSentence.STRIDE) if bits >> column & 1]
+    for bits in range(1 << BitSentence.STRIDE)
+]
+
+
+class IndexedSet():
+    """
+    Set supporting O(1) add, remove and uniformly random choice, by
+    keeping its items in a list along with each item's position.
+    """
+
+    def __init__(self, items=()):
+        self.items = []
+        self.positions = dict()
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        """
+        Removes the item, if present, by moving the last item into its place.
+        """
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last] = position
+
+    def choice(self):
+        return random.choice(self.items)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, bitset=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Number of mines on the board, if known
+        self.mine_count = mines
+
+        # Whether to represent sentences as a BitSentence
+        self.bitset = bitset
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -153,8 +451,73 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells not yet chosen nor known to be safe or mines
+        self.undetermined = IndexedSet(
+            itertools.product(range(self.height), range(self.width))
+        )
+
+        # Safe cells in the order found, including some since chosen
+        self.ready = []
+
+        # Sentences about the game known to be true, by Sentence.key()
+        self.knowledge = dict()
+
+        # Keys of the sentences that mention each cell, by the cell's
+        # member() key
+        self.index = dict()
+
+        # Keys of sentences added or changed since they were last inferred from
+        self.worklist = []
+
+        # Number of sentences and seconds taken after each add_knowledge
+        self.updates = []
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it is empty or
+        already known. Returns whether it was added.
+        """
+        key = sentence.key()
+        if key in self.knowledge:
+            return False
+        members = sentence.members()
+        if not members:
+            return False
+        self.knowledge[key] = sentence
+        for member in members:
+            self.index.setdefault(member, set()).add(key)
+        self.worklist.append(key)
+        return True
+
+    def remove_sentence(self, key):
+        """
+        Removes the sentence with the given key from the knowledge base,
+        and returns it.
+        """
+        sentence = self.knowledge.pop(key)
+        for member in sentence.members():
+            keys = self.index[member]
+            keys.discard(key)
+            if not keys:
+                del self.index[member]
+        return sentence
+
+    def member(self, cell):
+        """
+        Returns the key by which the index knows a cell: the cell itself,
+        or its number i * width + j when sentences are BitSentences.
+        """
+        if self.bitset:
+            return cell[0] * self.width + cell[1]
+        return cell
+
+    def cell(self, member):
+        """
+        Returns the cell the index knows by a key.
+        """
+        if self.bitset:
+            return divmod(member, self.width)
+        return member
 
     def mark_mine(self, cell):
         """
@@ -162,17 +525,25 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        self.undetermined.discard(cell)
+        for key in list(self.index.get(self.member(cell), ())):
+            sentence = self.remove_sentence(key)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes and cell not in self.moves_made:
+            self.ready.append(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        self.undetermined.discard(cell)
+        for key in list(self.index.get(self.member(cell), ())):
+            sentence = self.remove_sentence(key)
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -189,8 +560,11 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
+        start = time.perf_counter()
+
         # 1) mark the cell as a move that has been made
         self.moves_made.add(cell)
+        self.undetermined.discard(cell)
         # 2) mark the cell as safe
         self.mark_safe(cell)
         # 3) add a new sentence to the AI's knowledge base based on the value of `cell` and `count`
@@ -209,41 +583,57 @@ class MinesweeperAI():
                         and (0 <= i < self.height and 0 <= j < self.width):
                     undetermined_neighbors_cell.add((i, j))
 
-        new_sentence = Sentence(undetermined_neighbors_cell, count - known_mines_count)
-        self.knowledge.append(new_sentence)
-
-        # 4) mark any additional cells as safe or as mines
-        # if it can be concluded based on the AI's knowledge base
-        # If, based on any of the sentences in self.knowledge, new cells can be marked as safe or as mines,
-        # then the function should do so.
-        for sentence in self.knowledge:
-            known_safe_cells = sentence.known_safes()
-            known_mines = sentence.known_mines()
-
-            for known_safes_cell in known_safe_cells:
-                self.mark_safe(known_safes_cell)
-            for known_mine in known_mines:
-                self.mark_mine(known_mine)
-
-        # If, based on any of the sentences in self.knowledge,
-        # new sentences can be inferred (using the subset method described in the Background),
-        # then those sentences should be added to the knowledge base as well.
-        for sentence in self.knowledge:
-            if new_sentence != sentence \
-                    and new_sentence.cells.issubset(sentence.cells) \
-                    and new_sentence.count > 0 \
-                    and sentence.count > 0:
-                # {A, B, C, D, E} = 2 , {A, B, C} = 1 and {D, E} = 1
-                # set2 - set1 = count2 - count1
-                sub_sentence = Sentence(
-                    sentence.cells - new_sentence.cells,
-                    sentence.count - new_sentence.count
-                )
-                self.knowledge.append(sub_sentence)
+        if self.bitset:
+            new_sentence = BitSentence(
+                undetermined_neighbors_cell, count - known_mines_count, self.width
+            )
+        else:
+            new_sentence = Sentence(undetermined_neighbors_cell, count - known_mines_count)
+        self.add_sentence(new_sentence)
+
+        # 4) and 5) draw inferences from every sentence added or changed
+        # since the last inference, until nothing new can be concluded
+        self.infer()
 
-        # Note that any time that you make any change to your AI’s knowledge,
-        # it may be possible to draw new inferences that weren’t possible before.
-        # Be sure that those new inferences are added to the knowledge base if it is possible to do so.
+        self.updates.append((len(self.knowledge), time.perf_counter() - start))
+
+    def infer(self):
+        """
+        Marks known safes and mines, and adds sentences inferred by the
+        subset method, for each sentence on the worklist. Sentences that
+        change along the way are put back on the worklist, so this stops
+        only once no more can be concluded.
+        """
+        while self.worklist:
+            key = self.worklist.pop()
+
+            # Skip sentences changed or removed since they were queued
+            sentence = self.knowledge.get(key)
+            if sentence is None:
+                continue
+
+            # Marking cells removes them from this sentence
+            known = sentence.known_safes() or sentence.known_mines()
+            if known:
+                mark = self.mark_safe if sentence.count == 0 else self.mark_mine
+                for cell in known:
+                    mark(cell)
+                continue
+
+            # Only sentences sharing a cell can contain one another
+            # {A, B, C, D, E} = 2 , {A, B, C} = 1 and {D, E} = 1
+            others = set()
+            for member in sentence.members():
+                others |= self.index[member]
+            others.discard(key)
+            for other_key in others:
+                other = self.knowledge.get(other_key)
+                if other is None:
+                    continue
+                if sentence.issubset(other):
+                    self.add_sentence(other.difference(sentence))
+                elif other.issubset(sentence):
+                    self.add_sentence(sentence.difference(other))
 
     def make_safe_move(self):
         """
@@ -254,25 +644,369 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        safe_unmoved_cell = self.safes - self.moves_made
-        if safe_unmoved_cell:
-            return safe_unmoved_cell.pop()
+        # Drop cells chosen since they were found to be safe
+        while self.ready and self.ready[-1] in self.moves_made:
+            self.ready.pop()
+        if self.ready:
+            return self.ready[-1]
         return None
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Chooses randomly among the cells least likely to be mines that:
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        possible_moves = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                possible_moves.add((i, j))
+        probabilities, outside = self.frontier_probabilities()
+        unconstrained = len(self.undetermined) - len(self.index)
+        risk = min(probabilities.values(), default=1.0)
+        if unconstrained and outside < risk - 1e-9:
+            return self.unconstrained_move()
+        candidates = [
+            cell for cell, probability in probabilities.items()
+            if probability <= risk + 1e-9
+        ]
+
+        # Choose among all equally risky cells, inside sentences or not
+        if unconstrained and outside <= risk + 1e-9:
+            if random.randrange(len(candidates) + unconstrained) >= len(candidates):
+                return self.unconstrained_move()
+        if candidates:
+            return random.choice(candidates)
+        return None
 
-        possible_moves = possible_moves - self.moves_made - self.mines
+    def unconstrained_move(self):
+        """
+        Returns a random undetermined cell outside every sentence.
+        """
 
-        if possible_moves:
-            return possible_moves.pop()
-        return None
+        # Rejection sampling is fast unless most cells are in sentences
+        for _ in range(16):
+            cell = self.undetermined.choice()
+            if self.member(cell) not in self.index:
+                return cell
+        return random.choice([
+            cell for cell in self.undetermined if self.member(cell) not in self.index
+        ])
+
+    def mine_probabilities(self):
+        """
+        Returns the probability that each cell not yet chosen or known to
+        be a mine is a mine, given the knowledge base and the number of
+        mines on the board, with every consistent placement equally likely.
+        """
+        probabilities, outside = self.frontier_probabilities()
+        for cell in self.undetermined:
+            if cell not in probabilities:
+                probabilities[cell] = outside
+        return probabilities
+
+    def frontier_probabilities(self):
+        """
+        Returns the probabilities of mine_probabilities for cells in some
+        sentence or known to be safe, and the probability shared by every
+        other undetermined cell.
+        """
+        unconstrained = len(self.undetermined) - len(self.index)
+        if self.mine_count is None:
+            remaining = None
+        else:
+            remaining = self.mine_count - len(self.mines)
+
+        # Count mine placements in each component separately, by number of
+        # mines. Each component gets an equal share of the time left, and
+        # is sampled for the rest of its share if it cannot be counted in
+        # half of it. Smallest components go first, so the time they leave
+        # over goes to larger ones. Components for which no placement was
+        # found are treated like cells outside every sentence.
+        deadline = time.perf_counter() + PROBABILITY_SECONDS
+        components = []
+        distributions = []
+        uncounted = []
+        pending = sorted(self.components(), key=lambda component: len(component[0]))
+        for c, (cells, sentences) in enumerate(pending):
+            start = time.perf_counter()
+            budget = max(deadline - start, 0) / (len(pending) - c)
+            try:
+                distribution = self.count_configurations(
+                    cells, sentences, start + budget / 2
+                )
+            except TimeoutError:
+                distribution = self.sample_configurations(
+                    cells, sentences, start + budget
+                )
+            if distribution:
+                components.append((cells, sentences))
+                distributions.append(distribution)
+            else:
+                uncounted.extend(cells)
+        unconstrained += len(uncounted)
+
+        # Scale each component's counts to keep their products within floats
+        for c, distribution in enumerate(distributions):
+            scale = max(total for total, _ in distribution.values())
+            distributions[c] = {
+                k: (total / scale, [count / scale for count in counts])
+                for k, (total, counts) in distribution.items()
+            }
+
+        # Ways for the components before each one to hold each number of mines
+        ways = [
+            {k: total for k, (total, _) in distribution.items()}
+            for distribution in distributions
+        ]
+        prefixes = [{0: 1.0}]
+        for component in ways:
+            prefixes.append(convolve(prefixes[-1], component))
+
+        # Relative ways to place the other mines outside the components
+        weights = dict()
+        for mines in prefixes[-1]:
+            if remaining is None:
+                weights[mines] = 0.0
+            elif 0 <= remaining - mines <= unconstrained:
+                weights[mines] = (
+                    math.lgamma(unconstrained + 1) - math.lgamma(remaining - mines + 1)
+                    - math.lgamma(unconstrained - remaining + mines + 1)
+                )
+        if not weights:
+
+            # Sampled components may disagree with the mine count
+            remaining = None
+            weights = dict.fromkeys(prefixes[-1], 0.0)
+        top = max(weights.values())
+        weights = {mines: math.exp(log - top) for mines, log in weights.items()}
+
+        # Weighted ways to place the mines of each component onward and
+        # outside, by the number of mines held by the components before it
+        tails = [weights]
+        for c in reversed(range(len(ways))):
+            tails.append({
+                before: sum(
+                    count * tails[-1].get(before + k, 0) for k, count in ways[c].items()
+                )
+                for before in prefixes[c]
+            })
+        tails.reverse()
+        total = tails[0][0]
+
+        probabilities = dict()
+        for c, ((cells, _), distribution) in enumerate(zip(components, distributions)):
+            mines = [0.0] * len(cells)
+            for k, (_, counts) in distribution.items():
+                share = sum(
+                    count * tails[c + 1].get(before + k, 0)
+                    for before, count in prefixes[c].items()
+                ) / total
+                for n, count in enumerate(counts):
+                    mines[n] += count * share
+            for cell, probability in zip(cells, mines):
+                probabilities[cell] = probability
+
+        # Cells outside every sentence share the mines placed outside,
+        # or without a mine count are assumed as likely as the rest
+        outside = None
+        if unconstrained:
+            if remaining is None:
+                outside = sum(probabilities.values()) / max(len(probabilities), 1)
+            else:
+                outside = sum(
+                    count * weights.get(mines, 0) * (remaining - mines)
+                    for mines, count in prefixes[-1].items()
+                ) / total / unconstrained
+        for cell in uncounted:
+            probabilities[cell] = outside
+        for cell in self.ready:
+            if cell not in self.moves_made:
+                probabilities[cell] = 0.0
+        return probabilities, outside
+
+    def components(self):
+        """
+        Returns a list of (cells, sentences) for each group of cells linked
+        by sentences, with cells in breadth-first order.
+        """
+        components = []
+        seen = set()
+        for start in self.index:
+            if start in seen:
+                continue
+            seen.add(start)
+            members = [start]
+            keys = set()
+            for member in members:
+                for key in self.index[member]:
+                    if key in keys:
+                        continue
+                    keys.add(key)
+                    for other in self.knowledge[key].members():
+                        if other not in seen:
+                            seen.add(other)
+                            members.append(other)
+            cells = [self.cell(member) for member in members]
+            components.append((cells, [self.knowledge[key] for key in keys]))
+        return components
+
+    def constraints(self, cells, sentences):
+        """
+        Returns, for each position in `cells`, the (index, cells left)
+        of every sentence containing that cell, where cells left counts
+        the sentence's cells after that position; and the positions at
+        which each sentence has had some but not all cells assigned.
+        """
+        position = {self.member(cell): n for n, cell in enumerate(cells)}
+        touching = [[] for _ in cells]
+        opened = [[] for _ in cells]
+        closed = [[] for _ in cells]
+        for c, sentence in enumerate(sentences):
+            members = sorted(position[member] for member in sentence.members())
+            for left, n in enumerate(reversed(members)):
+                touching[n].append((c, left))
+            opened[members[0]].append(c)
+            closed[members[-1]].append(c)
+
+        # Sweep through the cells, opening and closing sentences
+        open_at = []
+        active = set()
+        for n in range(len(cells)):
+            open_at.append(sorted(active))
+            active.update(opened[n])
+            active.difference_update(closed[n])
+        return touching, open_at
+
+    def count_configurations(self, cells, sentences, deadline):
+        """
+        Returns {k: (ways, counts)} over the placements of mines in `cells`
+        consistent with `sentences`, where ways is the number with k mines
+        and counts[n] how many of those have a mine in cells[n].
+        Raises TimeoutError once past `deadline`.
+
+        Cells are assigned in order, and placements that leave the same
+        residual counts for the partly assigned sentences are merged:
+        a forward pass counts the ways to reach each state by number of
+        mines, and a backward pass the ways to finish from it.
+        """
+        touching, open_at = self.constraints(cells, sentences)
+        open_at.append([])
+        size = len(cells)
+
+        # Ways to reach each state before cells[n], and the transitions out
+        forward = [{(): {0: 1}}]
+        edges = []
+        for n in range(size):
+            reached = dict()
+            edges.append([])
+            for state, ways in forward[n].items():
+                if time.perf_counter() > deadline:
+                    raise TimeoutError
+                for mine, after in self.transitions(sentences, touching, open_at, n, state):
+                    edges[n].append((state, mine, after))
+                    target = reached.setdefault(after, dict())
+                    for k, count in ways.items():
+                        target[k + mine] = target.get(k + mine, 0) + count
+            forward.append(reached)
+
+        # Ways to finish from each state, cells[n:] holding k mines
+        backward = [dict() for _ in range(size)] + [{(): {0: 1}}]
+        for n in reversed(range(size)):
+            for state, mine, after in edges[n]:
+                ways = backward[n].setdefault(state, dict())
+                for k, count in backward[n + 1].get(after, {}).items():
+                    ways[k + mine] = ways.get(k + mine, 0) + count
+
+        result = {
+            k: (ways, [0] * size) for k, ways in backward[0].get((), {}).items()
+        }
+        for n in range(size):
+            for state, mine, after in edges[n]:
+                if not mine:
+                    continue
+                for before, first in forward[n][state].items():
+                    for rest, second in backward[n + 1].get(after, {}).items():
+                        result[before + 1 + rest][1][n] += first * second
+        return result
+
+    def transitions(self, sentences, touching, open_at, n, state):
+        """
+        Returns (mine, next state) for each value of cells[n] consistent
+        with the residual counts `state` of the sentences in open_at[n].
+        """
+        residual = dict(zip(open_at[n], state))
+        result = []
+        for mine in (0, 1):
+            after = dict()
+            for c, left in touching[n]:
+                count = residual.get(c, sentences[c].count) - mine
+                if not 0 <= count <= left:
+                    break
+                after[c] = count
+            else:
+                result.append((mine, tuple(
+                    after[c] if c in after else residual[c] for c in open_at[n + 1]
+                )))
+        return result
+
+    def sample_configurations(self, cells, sentences, deadline):
+        """
+        Returns {k: (samples, counts)} in the form of count_configurations,
+        over placements of mines found by randomized depth-first search
+        until `deadline`.
+        """
+        touching, _ = self.constraints(cells, sentences)
+        size = len(cells)
+        result = dict()
+        for _ in range(SAMPLES):
+            if time.perf_counter() > deadline:
+                break
+            residual = [sentence.count for sentence in sentences]
+            placement = []
+            choices = []
+            nodes = 0
+            n = 0
+            while 0 <= n < size:
+
+                # Arriving at cells[n], pick an order in which to try its values
+                if len(choices) == n:
+                    nodes += 1
+                    if nodes > SAMPLE_NODES or time.perf_counter() > deadline:
+                        break
+                    choices.append(random.sample((0, 1), 2))
+
+                # Undo the value last tried for cells[n], if any
+                if len(placement) > n:
+                    mine = placement.pop()
+                    for c, _ in touching[n]:
+                        residual[c] += mine
+
+                # Backtrack once every value has been tried
+                if not choices[n]:
+                    choices.pop()
+                    n -= 1
+                    continue
+                mine = choices[n].pop()
+                if all(0 <= residual[c] - mine <= left for c, left in touching[n]):
+                    for c, _ in touching[n]:
+                        residual[c] -= mine
+                    placement.append(mine)
+                    n += 1
+
+            if n != size:
+                continue
+            samples, counts = result.get(sum(placement), (0, [0] * size))
+            result[sum(placement)] = (samples + 1, [
+                count + mine for count, mine in zip(counts, placement)
+            ])
+        return result
+
+
+def convolve(first, second):
+    """
+    Returns the ways to hold each number of mines across two independent
+    groups of cells, given the ways for each group.
+    """
+    result = dict()
+    for i, x in first.items():
+        for j, y in second.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
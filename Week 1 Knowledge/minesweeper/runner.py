@@ -1,6 +1,5 @@
 import pygame
 import sys
-import time
 
 from minesweeper import Minesweeper, MinesweeperAI
 
@@ -8,6 +7,9 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Most frames drawn per second
+FPS = 30
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -17,6 +19,7 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
@@ -37,188 +40,246 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+# Pre-render every way a cell can look
+blank = pygame.Surface((cell_size, cell_size))
+blank.fill(GRAY)
+pygame.draw.rect(blank, WHITE, blank.get_rect(), 3)
+flagged = blank.copy()
+flagged.blit(flag, (0, 0))
+mined = blank.copy()
+mined.blit(mine, (0, 0))
+numbers = []
+for n in range(9):
+    number = blank.copy()
+    text = smallFont.render(str(n), True, BLACK)
+    textRect = text.get_rect()
+    textRect.center = number.get_rect().center
+    number.blit(text, textRect)
+    numbers.append(number)
+
+# Buttons
+playButton = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+
+# Area showing whether the game was won or lost
+statusRect = pygame.Rect((2 / 3) * width, (2 / 3) * height - 25, width / 3, 50)
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
 flags = set()
 lost = False
 
-# Show instructions initially
-instructions = True
 
-while True:
+def cell_rect(cell):
+    """Returns the rectangle a cell is drawn in."""
+    i, j = cell
+    return pygame.Rect(
+        board_origin[0] + j * cell_size,
+        board_origin[1] + i * cell_size,
+        cell_size, cell_size
+    )
 
-    # Check if game quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            sys.exit()
 
-    screen.fill(BLACK)
+def cell_at(position):
+    """Returns the cell under a position on screen, or None."""
+    x, y = position
+    i = (y - board_origin[1]) // cell_size
+    j = (x - board_origin[0]) // cell_size
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (int(i), int(j))
+    return None
 
-    # Show game instructions
-    if instructions:
-
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
 
-        # Check if play button clicked
-        click, _, _ = pygame.mouse.get_pressed()
-        if click == 1:
-            mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
-                instructions = False
-                time.sleep(0.3)
+def cell_surface(cell):
+    """Returns the pre-rendered surface showing a cell's current state."""
+    if game.is_mine(cell) and lost:
+        return mined
+    elif cell in flags:
+        return flagged
+    elif cell in revealed:
+        return numbers[game.nearby_mines(cell)]
+    return blank
 
-        pygame.display.flip()
-        continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
+def game_status():
+    """Returns the text shown beside the board."""
+    return "Lost" if lost else "Won" if game.mines == flags else ""
 
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
+
+def draw_button(rect, label):
+    pygame.draw.rect(screen, WHITE, rect)
+    text = mediumFont.render(label, True, BLACK)
+    textRect = text.get_rect()
+    textRect.center = rect.center
+    screen.blit(text, textRect)
+
+
+def draw_status(status):
+    """Draws the game status, and returns the area drawn."""
+    screen.fill(BLACK, statusRect)
+    text = mediumFont.render(status, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
     screen.blit(text, textRect)
+    return statusRect
 
-    move = None
 
-    left, _, right = pygame.mouse.get_pressed()
+def draw_instructions():
+    screen.fill(BLACK)
 
-    # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
-
-    elif left == 1:
-        mouse = pygame.mouse.get_pos()
-
-        # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            print(f'ai safe moves: {move}')
-            if move is None:
-                move = ai.make_random_move()
-                print(f'ai random moves: {move}')
+    # Title
+    title = largeFont.render("Play Minesweeper", True, WHITE)
+    titleRect = title.get_rect()
+    titleRect.center = ((width / 2), 50)
+    screen.blit(title, titleRect)
+
+    # Rules
+    rules = [
+        "Click a cell to reveal it.",
+        "Right-click a cell to mark it as a mine.",
+        "Mark all mines successfully to win!"
+    ]
+    for i, rule in enumerate(rules):
+        line = smallFont.render(rule, True, WHITE)
+        lineRect = line.get_rect()
+        lineRect.center = ((width / 2), 150 + 30 * i)
+        screen.blit(line, lineRect)
+
+    # Play game button
+    draw_button(playButton, "Play Game")
+
+
+def draw_game():
+    screen.fill(BLACK)
+    for i in range(HEIGHT):
+        for j in range(WIDTH):
+            screen.blit(cell_surface((i, j)), cell_rect((i, j)))
+    draw_button(aiButton, "AI Move")
+    draw_button(resetButton, "Reset")
+    draw_status(game_status())
+
+
+# Show instructions initially
+instructions = True
+draw_instructions()
+pygame.display.flip()
+status = ""
+
+while True:
+
+    # Sleep until something happens, then handle everything queued
+    events = [pygame.event.wait()] + pygame.event.get()
+
+    # Cells whose state changed, or whether the whole screen must be drawn
+    changed = set()
+    redraw = False
+
+    for event in events:
+
+        # Check if game quit
+        if event.type == pygame.QUIT:
+            sys.exit()
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            continue
+
+        # Check if play button clicked
+        if instructions:
+            if event.button == 1 and playButton.collidepoint(event.pos):
+                instructions = False
+                redraw = True
+            continue
+
+        move = None
+        cell = cell_at(event.pos)
+
+        # Check for a right-click to toggle flagging
+        if event.button == 3 and not lost:
+            if cell is not None and cell not in revealed:
+                if cell in flags:
+                    flags.remove(cell)
+                else:
+                    flags.add(cell)
+                changed.add(cell)
+
+        elif event.button == 1:
+
+            # If AI button clicked, make an AI move
+            if aiButton.collidepoint(event.pos) and not lost:
+                move = ai.make_safe_move()
+                print(f'ai safe moves: {move}')
                 if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
+                    move = ai.make_random_move()
+                    print(f'ai random moves: {move}')
+                    if move is None:
+                        changed |= flags ^ ai.mines
+                        flags = ai.mines.copy()
+                        print("No moves left to make.")
+                    else:
+                        print("No known safe moves, AI making random move.")
                 else:
-                    print("No known safe moves, AI making random move.")
+                    print("AI making safe move.")
+
+            # Reset game state
+            elif resetButton.collidepoint(event.pos):
+                game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+                ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
+                revealed = set()
+                flags = set()
+                lost = False
+                redraw = True
+                continue
+
+            # User-made move
+            elif not lost:
+                if cell is not None and cell not in flags and cell not in revealed:
+                    move = cell
+
+        # Make move and update AI knowledge
+        if move:
+            if game.is_mine(move):
+                lost = True
+                changed |= game.mines
             else:
-                print("AI making safe move.")
-            time.sleep(0.2)
-
-        # Reset game state
-        elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
-            continue
 
-        # User-made move
-        elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
-
-    # Make move and update AI knowledge
-    if move:
-        if game.is_mine(move):
-            lost = True
+                # Cells with no mines nearby reveal their unflagged neighbors too
+                for cell, nearby in game.reveal(move):
+                    if cell in revealed or (cell in flags and cell != move):
+                        continue
+                    revealed.add(cell)
+                    changed.add(cell)
+                    ai.add_knowledge(cell, nearby)
+                sentences, seconds = ai.updates[-1]
+                print(f"Knowledge: {sentences} sentences, updated in {seconds * 1000:.2f}ms")
+
+    # Draw only what changed since the last frame
+    if redraw:
+        if instructions:
+            draw_instructions()
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
-
-    pygame.display.flip()
+            draw_game()
+            status = game_status()
+        pygame.display.flip()
+    elif not instructions:
+        dirty = []
+        for cell in changed:
+            rect = cell_rect(cell)
+            screen.blit(cell_surface(cell), rect)
+            dirty.append(rect)
+        if game_status() != status:
+            status = game_status()
+            dirty.append(draw_status(status))
+        if dirty:
+            pygame.display.update(dirty)
+
+    clock.tick(FPS)
@@ -0,0 +1,114 @@
+"""
+Plays seeded games of Minesweeper against MinesweeperAI without pygame,
+across a pool of processes, and reports the AI's strength and speed.
+
+Usage: python simulate.py [--games N] [--height H] [--width W] [--mines M]
+                          [--seed S] [--processes P] [--bitset] [--json REPORT]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Moves between knowledge base sizes shown in the report
+SIZE_INTERVAL = 10
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--bitset", action="store_true")
+    parser.add_argument("--json", help="path to write the report to")
+    args = parser.parse_args()
+
+    games = [
+        (args.seed + n, args.height, args.width, args.mines, args.bitset)
+        for n in range(args.games)
+    ]
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(play, games)
+
+    report = summarize(results)
+    print(f"Games: {len(results)}")
+    print(f"Win rate: {report['win_rate']:.1%}")
+    print(f"Moves per game: {report['moves_per_game']:.1f}")
+    print(f"add_knowledge per move: {report['update_mean'] * 1000:.3f}ms average, "
+          f"{report['update_p99'] * 1000:.3f}ms p99")
+    print()
+    print(f"{'move':>6}{'games':>8}{'sentences':>12}")
+    for move, games, sentences in report["knowledge_size"][::SIZE_INTERVAL]:
+        print(f"{move:>6}{games:>8}{sentences:>12.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def play(game):
+    """
+    Plays the game given by (seed, height, width, mines, bitset) as the
+    runner's AI Move button would, revealing the region around cells
+    with no mines nearby, until the AI hits a mine or has no moves left.
+    Returns whether it won, the number of moves made, and the number of
+    sentences and seconds taken by the calls to add_knowledge for each.
+    """
+    seed, height, width, mines, bitset = game
+    random.seed(seed)
+    board = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, bitset=bitset)
+    moves = []
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None:
+            won = ai.mines == board.mines
+            break
+        if board.is_mine(move):
+            won = False
+            break
+        seconds = 0
+        for cell, nearby in board.reveal(move):
+            if cell not in ai.moves_made:
+                ai.add_knowledge(cell, nearby)
+                seconds += ai.updates[-1][1]
+        moves.append((len(ai.knowledge), seconds))
+    return {"seed": seed, "won": won, "moves": moves}
+
+
+def summarize(results):
+    """
+    Returns the win rate, moves per game, mean and 99th percentile
+    seconds spent in add_knowledge per move, and a list of (move, games
+    still going, mean sentences) over the games played.
+    """
+    times = sorted(seconds for result in results for _, seconds in result["moves"])
+    longest = max(len(result["moves"]) for result in results)
+    knowledge_size = []
+    for move in range(longest):
+        sizes = [
+            result["moves"][move][0] for result in results
+            if move < len(result["moves"])
+        ]
+        knowledge_size.append((move + 1, len(sizes), sum(sizes) / len(sizes)))
+    return {
+        "games": len(results),
+        "win_rate": sum(result["won"] for result in results) / len(results),
+        "moves_per_game": len(times) / len(results),
+        "update_mean": sum(times) / max(len(times), 1),
+        "update_p99": times[min(len(times) - 1, int(len(times) * 0.99))] if times else 0,
+        "knowledge_size": knowledge_size,
+        "lost_seeds": [result["seed"] for result in results if not result["won"]],
+    }
+
+
+if __name__ == "__main__":
+    main()
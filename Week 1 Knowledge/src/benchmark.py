@@ -0,0 +1,305 @@
+"""
+Times the logic.model_check backends on the Week 1 puzzles and on
+generated instances that grow with n, checks that the backends agree,
+and optionally writes a JSON report.
+
+Usage: python benchmark.py [--json REPORT] [backend ...]
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+from logic import *
+
+KNOWLEDGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backends whose cost grows with the number of models they visit
+ENUMERATING = ["truth_table", "compiled", "bitwise", "gray"]
+
+# Backends that fork worker processes, whose memory tracemalloc cannot see
+FORKING = ["parallel"]
+
+# Most symbols each backend is run on; larger instances are skipped
+SYMBOL_LIMITS = {
+    "truth_table": 12,
+    "compiled": 16,
+    "bitwise": 22,
+    "parallel": 16,
+    "gray": 14,
+    "partial": 20,
+    "dpll": None,
+    "bdd": None,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("backends", nargs="*", default=list(MODEL_CHECK_BACKENDS))
+    parser.add_argument("--json", help="path to write the report to")
+    args = parser.parse_args()
+    backends = args.backends
+    for backend in backends:
+        if backend not in MODEL_CHECK_BACKENDS:
+            sys.exit(f"Unknown backend: {backend}")
+
+    print(f"{'instance':<14}{'symbols':>8}" + "".join(
+        f"{backend:>14}" for backend in backends
+    ))
+    report = []
+    for name, knowledge, queries in itertools.chain(puzzles(), scaling()):
+        runs = {
+            backend: run(knowledge, queries, backend) for backend in backends
+        }
+        answers = {
+            tuple(result["answers"]) for result in runs.values()
+            if "answers" in result
+        }
+        report.append({
+            "instance": name,
+            "symbols": len(knowledge.symbols()),
+            "queries": len(queries),
+            "agree": len(answers) <= 1,
+            "runs": runs,
+        })
+        row = f"{name:<14}{len(knowledge.symbols()):>8}" + "".join(
+            f"{runs[backend]['seconds']:>13.4f}s" if "seconds" in runs[backend]
+            else f"{'-':>14}"
+            for backend in backends
+        )
+        if len(answers) > 1:
+            row += "  MISMATCH"
+        print(row)
+
+    # Enumerating backends visit every model when the query always holds
+    enumerating = [backend for backend in backends if backend in ENUMERATING]
+    print()
+    print(f"{'per model':<14}{'models':>8}" + "".join(
+        f"{backend:>14}" for backend in enumerating
+    ))
+    for name, knowledge, queries in puzzles():
+        models = 2 ** len(knowledge.symbols())
+        print(f"{name:<14}{models:>8}" + "".join(
+            f"{per_model_cost(knowledge, backend) * 1e6:>12.3f}us"
+            for backend in enumerating
+        ))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def load(path):
+    """Imports the puzzle script at `path`, relative to Week 1 Knowledge."""
+    name = "puzzle_" + path.replace("/", "_")[:-3]
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(KNOWLEDGE_DIRECTORY, path)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def puzzles():
+    """Yields (name, knowledge, queries) for every Week 1 puzzle."""
+    knights = load("knights/puzzle.py")
+    characters = [knights.AKnight, knights.AKnave, knights.BKnight,
+                  knights.BKnave, knights.CKnight, knights.CKnave]
+    for i in range(4):
+        yield f"knights{i}", getattr(knights, f"knowledge{i}"), characters
+
+    harry = load("src/harry.py")
+    yield "harry", harry.knowledge, [harry.rain, harry.hagrid, harry.dumbledore]
+
+    clue = load("src/clue.py")
+    yield "clue", clue.knowledge, clue.symbols
+
+    hogwarts = load("src/puzzle.py")
+    yield "hogwarts", hogwarts.knowledge, hogwarts.symbols
+
+    mastermind = load("src/mastermind.py")
+    yield "mastermind", mastermind.knowledge, mastermind.symbols
+
+
+def benchmark(knowledge, queries, backend):
+    """
+    Returns the seconds taken to check every query against the
+    knowledge base with `backend`, and the list of answers.
+    """
+    start = time.perf_counter()
+    answers = [model_check(knowledge, query, backend) for query in queries]
+    return time.perf_counter() - start, answers
+
+
+def scaling():
+    """Yields (name, knowledge, queries) for generated instances."""
+    for n in range(4, 7):
+        yield (f"queens{n}",) + queens(n)
+    for n in range(2, 6):
+        yield (f"pigeonhole{n}",) + pigeonhole(n)
+    for n in range(4, 7):
+        yield (f"mastermind{n}",) + mastermind(n, seed=n)
+    for n in range(3, 7):
+        yield (f"clue{n}",) + clue(n, seed=n)
+
+
+def exactly_one(symbols):
+    """Returns a sentence true when exactly one of `symbols` is true."""
+    return And(Or(*symbols), *(
+        Not(And(a, b)) for a, b in itertools.combinations(symbols, 2)
+    ))
+
+
+def exactly(k, symbols):
+    """Returns a sentence true when exactly k of `symbols` are true."""
+    return Or(*(
+        And(*(symbol if symbol in chosen else Not(symbol) for symbol in symbols))
+        for chosen in map(set, itertools.combinations(symbols, k))
+    ))
+
+
+def queens(n):
+    """Returns knowledge and queries placing n queens on an n x n board."""
+    board = [[Symbol(f"Q{i}_{j}") for j in range(n)] for i in range(n)]
+    cells = [(i, j) for i in range(n) for j in range(n)]
+    knowledge = And(*(Or(*row) for row in board))
+    for (i, j), (k, l) in itertools.combinations(cells, 2):
+        if i == k or j == l or abs(i - k) == abs(j - l):
+            knowledge.add(Not(And(board[i][j], board[k][l])))
+    return knowledge, [board[0][j] for j in range(n)]
+
+
+def pigeonhole(n):
+    """Returns the unsatisfiable knowledge of n + 1 pigeons in n holes."""
+    holes = [[Symbol(f"P{i}_{j}") for j in range(n)] for i in range(n + 1)]
+    knowledge = And(*(Or(*pigeon) for pigeon in holes))
+    for j in range(n):
+        for a, b in itertools.combinations(range(n + 1), 2):
+            knowledge.add(Not(And(holes[a][j], holes[b][j])))
+    return knowledge, [holes[0][0]]
+
+
+def mastermind(n, seed):
+    """
+    Returns knowledge and queries for mastermind with n colors in n
+    positions, given the score of n - 1 random guesses at a random secret.
+    """
+    rng = random.Random(seed)
+    colors = [f"color{c}" for c in range(n)]
+    grid = [[Symbol(f"{color}_{i}") for i in range(n)] for color in colors]
+    knowledge = And()
+    for c in range(n):
+        knowledge.add(exactly_one(grid[c]))
+        knowledge.add(exactly_one([grid[d][c] for d in range(n)]))
+    secret = rng.sample(range(n), n)
+    for _ in range(n - 1):
+        guess = rng.sample(range(n), n)
+        correct = sum(guess[i] == secret[i] for i in range(n))
+        knowledge.add(exactly(correct, [grid[guess[i]][i] for i in range(n)]))
+    return knowledge, [symbol for row in grid for symbol in row]
+
+
+def clue(n, seed):
+    """
+    Returns knowledge and queries for clue with n each of characters,
+    rooms and weapons, after seeing half of the cards not in the envelope.
+    """
+    rng = random.Random(seed)
+    categories = [
+        [Symbol(f"{kind}{i}") for i in range(n)]
+        for kind in ("character", "room", "weapon")
+    ]
+    knowledge = And(*(exactly_one(category) for category in categories))
+    envelope = [rng.choice(category) for category in categories]
+    cards = [
+        symbol for category in categories for symbol in category
+        if symbol not in envelope
+    ]
+    for card in rng.sample(cards, len(cards) // 2):
+        knowledge.add(Not(card))
+    return knowledge, [symbol for category in categories for symbol in category]
+
+
+def run(knowledge, queries, backend):
+    """
+    Checks every query against the knowledge base with `backend`, and
+    returns its answers, seconds taken, peak traced memory in bytes (or
+    for a forking backend, the largest worker's peak resident memory)
+    and logic.STATISTICS, or why it was skipped.
+    """
+    limit = SYMBOL_LIMITS.get(backend)
+    if limit is not None and len(knowledge.symbols()) > limit:
+        return {"skipped": f"more than {limit} symbols"}
+
+    # Each run starts from a copy without cached CNF or compiled code
+    STATISTICS.clear()
+    seconds, answers = benchmark(pickle.loads(pickle.dumps(knowledge)), queries, backend)
+    statistics = dict(STATISTICS)
+
+    # Forking while tracing can deadlock the new worker
+    if backend in FORKING:
+        memory = {"peak_worker_bytes": worker_peak(knowledge, queries, backend)}
+    else:
+        tracemalloc.start()
+        benchmark(pickle.loads(pickle.dumps(knowledge)), queries, backend)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"peak_bytes": peak}
+    return {
+        "answers": answers,
+        "seconds": seconds,
+        **memory,
+        "statistics": statistics,
+    }
+
+
+def worker_peak(knowledge, queries, backend):
+    """
+    Returns the peak resident memory in bytes of the largest worker
+    process forked by `backend` while checking every query. Runs in a
+    fresh process, so no earlier run's workers count towards the peak.
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=measure_workers, args=(knowledge, queries, backend, sender)
+    )
+    process.start()
+    sender.close()
+    peak = receiver.recv()
+    process.join()
+    return peak
+
+
+def measure_workers(knowledge, queries, backend, connection):
+    """Checks every query, then sends the peak memory of its workers."""
+    benchmark(knowledge, queries, backend)
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    connection.send(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def per_model_cost(knowledge, backend):
+    """
+    Returns the seconds `backend` spends per model on a full enumeration
+    of the models of the knowledge base.
+    """
+    symbol = Symbol(min(knowledge.symbols()))
+    start = time.perf_counter()
+    model_check(knowledge, Or(symbol, Not(symbol)), backend)
+    seconds = time.perf_counter() - start
+    return seconds / 2 ** len(knowledge.symbols())
+
+
+if __name__ == "__main__":
+    main()
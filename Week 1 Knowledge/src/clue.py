@@ -21,11 +21,13 @@ symbols = characters + rooms + weapons
 
 
 def check_knowledge(knowledge):
-    for symbol in symbols:
-        if model_check(knowledge, symbol):
+    results = model_check_many(knowledge, symbols)
+    count, counts = count_models(knowledge)
+    for symbol, result in zip(symbols, results):
+        if result == ENTAILED:
             termcolor.cprint(f"{symbol}: YES", "green")
-        elif not model_check(knowledge, Not(symbol)):
-            print(f"{symbol}: MAYBE")
+        elif result == UNKNOWN:
+            print(f"{symbol}: MAYBE ({counts[symbol.name] / count:.0%})")
 
 
 # There must be a person, room, and weapon.
@@ -49,4 +51,5 @@ knowledge.add(Or(
 knowledge.add(Not(plum))
 knowledge.add(Not(ballroom))
 
-check_knowledge(knowledge)
+if __name__ == "__main__":
+    check_knowledge(knowledge)
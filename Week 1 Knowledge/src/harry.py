@@ -10,5 +10,6 @@ knowledge = And(
     # Not(And(hagrid, dumbledore)),
     dumbledore
 )
-print(knowledge.formula())
-print(model_check(knowledge, hagrid))
+if __name__ == "__main__":
+    print(knowledge.formula())
+    print(model_check(knowledge, hagrid))
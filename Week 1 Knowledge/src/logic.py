@@ -1,12 +1,95 @@
+import collections
 import itertools
+import json
+import multiprocessing
+import os
+import weakref
+
+
+class EvaluationException(Exception):
+    pass
 
 
 class Sentence():
 
+    # Caches filled in on first use: hash, symbol set, clause form and
+    # compiled evaluator. An And, and any sentence containing one, may
+    # change; once built into other sentences it keeps weak references
+    # to them in _parents, by id, through which And.add drops the caches
+    # it makes stale.
+    __slots__ = (
+        "_hash", "_symbols", "_cnf", "_compiled", "_parents", "__weakref__"
+    )
+
+    def __getstate__(self):
+        """Pickles the sentence without its caches."""
+        return {
+            name: getattr(self, name)
+            for cls in type(self).__mro__
+            for name in getattr(cls, "__slots__", ())
+            if not name.startswith("_") and hasattr(self, name)
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.track(operands(self))
+
+    def track(self, children):
+        """
+        Registers the sentence as a parent of each of `children` that
+        may change, so that it is told when they do.
+        """
+        for child in children:
+            parents = getattr(child, "_parents", None)
+            if parents is None:
+                if not isinstance(child, And):
+                    continue
+                parents = child._parents = weakref.WeakValueDictionary()
+            parents[id(self)] = self
+            if getattr(self, "_parents", None) is None:
+                self._parents = weakref.WeakValueDictionary()
+
+    def changed(self, symbols):
+        """
+        Drops the caches of every sentence containing this one, after
+        this one has changed to also mention `symbols`.
+        """
+        parents = getattr(self, "_parents", None)
+        stack = list(parents.values()) if parents is not None else []
+        seen = set()
+        while stack:
+            sentence = stack.pop()
+            if id(sentence) in seen:
+                continue
+            seen.add(id(sentence))
+            sentence._hash = None
+            if getattr(sentence, "_symbols", None) is not None:
+                sentence._symbols = sentence._symbols.union(symbols)
+            sentence._cnf = None
+            sentence._compiled = None
+            stack.extend(sentence._parents.values())
+
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave some
+        symbols unassigned; returns None if the value is not yet known.
+        """
+        raise Exception("nothing to evaluate")
+
+    def evaluate_bits(self, columns, mask):
+        """
+        Evaluates the logical sentence in many models at once. `columns`
+        maps each symbol to an int whose bit k is its value in model k;
+        returns the int whose bits (within `mask`) mark the models in
+        which the sentence is true.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -15,6 +98,59 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def expression(self, variables):
+        """
+        Returns Python source evaluating the logical sentence, given
+        the source for the value of each symbol in `variables`.
+        """
+        raise Exception("nothing to evaluate")
+
+    def compile(self, symbols, bitmask=False):
+        """
+        Returns a function evaluating the logical sentence against a model
+        given as a sequence of truth values ordered like `symbols`, or
+        as an int whose bit i holds symbols[i] if `bitmask` is set.
+        """
+        key = (tuple(symbols), bitmask)
+        compiled = getattr(self, "_compiled", None)
+        if compiled is not None and compiled[0] == key:
+            return compiled[1]
+
+        if bitmask:
+            variables = {name: f"(m >> {i} & 1)" for i, name in enumerate(symbols)}
+        else:
+            variables = {name: f"m[{i}]" for i, name in enumerate(symbols)}
+        try:
+            code = compile(
+                f"lambda m: {self.expression(variables)}", "<sentence>", "eval"
+            )
+            function = eval(code)
+        except (SyntaxError, RecursionError, MemoryError):
+
+            # Too deeply nested for the parser; evaluate the sentence instead
+            names = list(symbols)
+            if bitmask:
+                def function(m):
+                    return self.evaluate({
+                        name: m >> i & 1 for i, name in enumerate(names)
+                    })
+            else:
+                def function(m):
+                    return self.evaluate(dict(zip(names, m)))
+        self._compiled = (key, function)
+        return function
+
+    def cnf(self):
+        """
+        Returns the clause form of the logical sentence, compiled
+        once and cached on the sentence.
+        """
+        if getattr(self, "_cnf", None) is None:
+            cnf = CNF()
+            cnf.add(self)
+            self._cnf = cnf
+        return self._cnf
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -43,6 +179,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -51,7 +188,9 @@ class Symbol(Sentence):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        if getattr(self, "_hash", None) is None:
+            self._hash = hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
@@ -62,6 +201,21 @@ class Symbol(Sentence):
         except KeyError:
             raise EvaluationException(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        return model.get(self.name)
+
+    def evaluate_bits(self, columns, mask):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise EvaluationException(f"variable {self.name} not in model")
+
+    def expression(self, variables):
+        try:
+            return variables[self.name]
+        except KeyError:
+            raise EvaluationException(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
@@ -70,15 +224,23 @@ class Symbol(Sentence):
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
+        self.track([operand])
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        if self is other:
+            return True
+        return (isinstance(other, Not) and hash(self) == hash(other)
+                and self.operand == other.operand)
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        if getattr(self, "_hash", None) is None:
+            self._hash = hash(("not", hash(self.operand)))
+        return self._hash
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +248,48 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
+    def evaluate_bits(self, columns, mask):
+        return mask ^ self.operand.evaluate_bits(columns, mask)
+
+    def expression(self, variables):
+        return f"(not {self.operand.expression(variables)})"
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
-        return self.operand.symbols()
+        if getattr(self, "_symbols", None) is None:
+            self._symbols = frozenset(self.operand.symbols())
+        return set(self._symbols)
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.track(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        if self is other:
+            return True
+        return (isinstance(other, And) and hash(self) == hash(other)
+                and self.conjuncts == other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        # Hashed one conjunct at a time, so that add can extend it
+        if getattr(self, "_hash", None) is None:
+            result = hash("and")
+            for conjunct in self.conjuncts:
+                result = hash((result, hash(conjunct)))
+            self._hash = result
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -116,10 +300,50 @@ class And(Sentence):
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
+        self.track([conjunct])
+
+        # Extend the cached hash, symbols and clause form rather than
+        # recomputing them; the compiled evaluator is redone
+        symbols = conjunct.symbols()
+        if getattr(self, "_hash", None) is not None:
+            self._hash = hash((self._hash, hash(conjunct)))
+        if getattr(self, "_symbols", None) is not None:
+            self._symbols = self._symbols.union(symbols)
+        if getattr(self, "_cnf", None) is not None:
+            self._cnf.add(conjunct)
+        self._compiled = None
+
+        # Sentences containing this one drop what it has made stale
+        self.changed(symbols)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    def evaluate_bits(self, columns, mask):
+        result = mask
+        for conjunct in self.conjuncts:
+            result &= conjunct.evaluate_bits(columns, mask)
+            if not result:
+                break
+        return result
+
+    def expression(self, variables):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(variables) for conjunct in self.conjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,22 +351,34 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if getattr(self, "_symbols", None) is None:
+            self._symbols = frozenset().union(
+                *[conjunct.symbols() for conjunct in self.conjuncts]
+            )
+        return set(self._symbols)
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self.track(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        if self is other:
+            return True
+        return (isinstance(other, Or) and hash(self) == hash(other)
+                and self.disjuncts == other.disjuncts)
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        if getattr(self, "_hash", None) is None:
+            self._hash = hash(
+                ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+            )
+        return self._hash
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,6 +387,31 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    def evaluate_bits(self, columns, mask):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.evaluate_bits(columns, mask)
+            if result == mask:
+                break
+        return result
+
+    def expression(self, variables):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(variables) for disjunct in self.disjuncts
+        ) + ")"
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,23 +419,37 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if getattr(self, "_symbols", None) is None:
+            self._symbols = frozenset().union(
+                *[disjunct.symbols() for disjunct in self.disjuncts]
+            )
+        return set(self._symbols)
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
+        self.track([antecedent, consequent])
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (isinstance(other, Implication)
+                and hash(self) == hash(other)
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        if getattr(self, "_hash", None) is None:
+            self._hash = hash(
+                ("implies", hash(self.antecedent), hash(self.consequent))
+            )
+        return self._hash
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +458,65 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
+    def evaluate_bits(self, columns, mask):
+        antecedent = self.antecedent.evaluate_bits(columns, mask)
+        if not antecedent:
+            return mask
+        return (mask ^ antecedent) | self.consequent.evaluate_bits(columns, mask)
+
+    def expression(self, variables):
+        antecedent = self.antecedent.expression(variables)
+        consequent = self.consequent.expression(variables)
+        return f"((not {antecedent}) or {consequent})"
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if getattr(self, "_symbols", None) is None:
+            self._symbols = frozenset().union(
+                self.antecedent.symbols(), self.consequent.symbols()
+            )
+        return set(self._symbols)
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
+        self.track([left, right])
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (isinstance(other, Biconditional)
+                and hash(self) == hash(other)
                 and self.left == other.left
                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        if getattr(self, "_hash", None) is None:
+            self._hash = hash(
+                ("biconditional", hash(self.left), hash(self.right))
+            )
+        return self._hash
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,27 +527,103 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def evaluate_bits(self, columns, mask):
+        left = self.left.evaluate_bits(columns, mask)
+        right = self.right.evaluate_bits(columns, mask)
+        return mask ^ left ^ right
+
+    def expression(self, variables):
+        left = self.left.expression(variables)
+        right = self.right.expression(variables)
+        return f"((not {left}) == (not {right}))"
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+        if getattr(self, "_symbols", None) is None:
+            self._symbols = frozenset().union(
+                self.left.symbols(), self.right.symbols()
+            )
+        return set(self._symbols)
+
+
+# Canonical sentences shared by hash_cons, keyed by the sentences themselves
+INTERNED = dict()
+
+
+def hash_cons(sentence, table=INTERNED):
+    """
+    Returns a sentence equal to `sentence` in which structurally identical
+    sub-sentences are one shared object, drawn from `table`.
+
+    And sentences are rebuilt but never shared, since And.add mutates
+    them in place.
+    """
+    if isinstance(sentence, Symbol):
+        shared = sentence
+    elif isinstance(sentence, Not):
+        shared = Not(hash_cons(sentence.operand, table))
+    elif isinstance(sentence, And):
+        return And(*[hash_cons(conjunct, table)
+                     for conjunct in sentence.conjuncts])
+    elif isinstance(sentence, Or):
+        shared = Or(*[hash_cons(disjunct, table)
+                      for disjunct in sentence.disjuncts])
+    elif isinstance(sentence, Implication):
+        shared = Implication(hash_cons(sentence.antecedent, table),
+                             hash_cons(sentence.consequent, table))
+    elif isinstance(sentence, Biconditional):
+        shared = Biconditional(hash_cons(sentence.left, table),
+                               hash_cons(sentence.right, table))
+    else:
+        raise TypeError("must be a logical sentence")
+    return table.setdefault(shared, shared)
+
+
+# Work done by the model_check backends, for benchmarking: "models"
+# (complete or partial) examined, solver "decisions" and "conflicts",
+# and BDD "nodes" created
+STATISTICS = collections.Counter()
+
+
+def model_check(knowledge, query, backend="compiled"):
+    """
+    Checks if knowledge base entails query.
+
+    `backend` names one of MODEL_CHECK_BACKENDS; the truth-table
+    enumerator is the reference implementation.
+    """
+    try:
+        check = MODEL_CHECK_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"unknown model_check backend {backend!r}")
+    return check(knowledge, query)
+
+
+def model_check_truth_table(knowledge, query):
+    """Checks if knowledge base entails query by enumerating all models."""
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
-        print(knowledge, query, symbols, model)
+
         # If model has an assignment for each symbol
         if not symbols:
+            STATISTICS["models"] += 1
 
             # If knowledge base is true in model, then query must also be true
             if knowledge.evaluate(model):
-                print(query, query.evaluate(model))
                 return query.evaluate(model)
             return True
         else:
@@ -260,7 +647,1290 @@ def model_check(knowledge, query):
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
-    print(symbols)
-
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating all models,
+    evaluating both sentences as compiled functions over tuples.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    knowledge_holds = knowledge.compile(symbols)
+    query_holds = query.compile(symbols)
+    models = itertools.product((True, False), repeat=len(symbols))
+    for visited, model in enumerate(models, 1):
+        if knowledge_holds(model) and not query_holds(model):
+            STATISTICS["models"] += visited
+            return False
+    STATISTICS["models"] += 1 << len(symbols)
+    return True
+
+
+# Symbols enumerated within one chunk of bit-parallel models (2^18 models)
+CHUNK_SYMBOLS = 18
+
+
+def model_check_bitwise(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both sentences
+    on whole chunks of models at once, packed one model per bit of an
+    int, so And, Or and Not become single bitwise operations.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    for columns, mask in bit_chunks(symbols):
+        STATISTICS["models"] += mask.bit_length()
+        models = knowledge.evaluate_bits(columns, mask)
+        if models & ~query.evaluate_bits(columns, mask):
+            return False
+    return True
+
+
+def bit_chunks(symbols):
+    """
+    Yields (columns, mask) for each chunk of models over `symbols`, as
+    expected by Sentence.evaluate_bits. The columns dict is reused.
+    """
+    inner = symbols[:CHUNK_SYMBOLS]
+    outer = symbols[CHUNK_SYMBOLS:]
+    mask = (1 << (1 << len(inner))) - 1
+
+    # Bit k of the column for inner symbol i is bit i of k
+    columns = dict()
+    for i, name in enumerate(inner):
+        block = 1 << i
+        column = ((1 << block) - 1) << block
+        width = block * 2
+        while width < 1 << len(inner):
+            column |= column << width
+            width *= 2
+        columns[name] = column
+
+    # Outer symbols are constant within a chunk
+    for chunk in range(1 << len(outer)):
+        for i, name in enumerate(outer):
+            columns[name] = mask if chunk >> i & 1 else 0
+        yield columns, mask
+
+
+def model_check_gray(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating all models in
+    Gray-code order, so consecutive models differ in one symbol and only
+    the sub-sentences depending on it are re-evaluated.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    evaluator = IncrementalEvaluator([knowledge, query], symbols)
+    value = evaluator.value
+    knowledge_node, query_node = evaluator.roots
+
+    # Step k flips the symbol numbered by the lowest set bit of k
+    STATISTICS["models"] += 1
+    if value[knowledge_node] and not value[query_node]:
+        return False
+    for step in range(1, 1 << len(symbols)):
+        evaluator.flip((step & -step).bit_length() - 1)
+        if value[knowledge_node] and not value[query_node]:
+            STATISTICS["models"] += step
+            return False
+    STATISTICS["models"] += (1 << len(symbols)) - 1
+    return True
+
+
+class IncrementalEvaluator():
+    """
+    Values of every sub-sentence of some sentences under an assignment
+    that changes one symbol at a time, starting with all symbols false.
+
+    Sentences are flattened into nodes, children before parents, with
+    structurally identical sub-sentences sharing a node. And and Or
+    nodes count their false and true children respectively, so when a
+    symbol flips, changes travel upwards only while values keep changing
+    and each parent update costs O(1).
+    """
+
+    def __init__(self, sentences, symbols):
+        self.kinds = []
+        self.children = []
+        self.parents = []
+        self.value = []
+        self.count = []
+        self.nodes = dict()
+        self.roots = [self.node(sentence) for sentence in sentences]
+        self.symbol_nodes = [self.nodes.get(Symbol(name)) for name in symbols]
+
+        # Every symbol starts false; nodes are in bottom-up order
+        for node, kind in enumerate(self.kinds):
+            values = [self.value[child] for child in self.children[node]]
+            if kind is And:
+                self.count[node] = values.count(False)
+                self.value[node] = self.count[node] == 0
+            elif kind is Or:
+                self.count[node] = values.count(True)
+                self.value[node] = self.count[node] > 0
+            elif kind is not Symbol:
+                self.value[node] = self.recompute(node)
+
+    def node(self, sentence):
+        """Returns the node for `sentence`, adding nodes as needed."""
+        if sentence in self.nodes:
+            return self.nodes[sentence]
+        if isinstance(sentence, Symbol):
+            kind, children = Symbol, []
+        elif isinstance(sentence, Not):
+            kind, children = Not, [sentence.operand]
+        elif isinstance(sentence, And):
+            kind, children = And, sentence.conjuncts
+        elif isinstance(sentence, Or):
+            kind, children = Or, sentence.disjuncts
+        elif isinstance(sentence, Implication):
+            kind, children = Implication, [sentence.antecedent, sentence.consequent]
+        elif isinstance(sentence, Biconditional):
+            kind, children = Biconditional, [sentence.left, sentence.right]
+        else:
+            raise TypeError("must be a logical sentence")
+
+        children = [self.node(child) for child in children]
+        node = len(self.kinds)
+        self.kinds.append(kind)
+        self.children.append(children)
+        self.parents.append([])
+        self.value.append(False)
+        self.count.append(0)
+        for child in children:
+            self.parents[child].append(node)
+        self.nodes[sentence] = node
+        return node
+
+    def recompute(self, node):
+        """Returns the value of a Not, Implication or Biconditional node."""
+        kind = self.kinds[node]
+        children = self.children[node]
+        if kind is Not:
+            return not self.value[children[0]]
+        if kind is Implication:
+            return not self.value[children[0]] or self.value[children[1]]
+        return self.value[children[0]] == self.value[children[1]]
+
+    def flip(self, index):
+        """Negates the symbol `symbols[index]` and updates dependent values."""
+        node = self.symbol_nodes[index]
+        if node is None:
+            return
+        kinds, children, parents = self.kinds, self.children, self.parents
+        value, count = self.value, self.count
+        value[node] = not value[node]
+
+        # Each change carries the value it changed to, as a node may
+        # change back before its first change has been passed on
+        changes = [(node, value[node])]
+        while changes:
+            child, changed = changes.pop()
+            for parent in parents[child]:
+                kind = kinds[parent]
+                if kind is And:
+                    count[parent] += -1 if changed else 1
+                    new = count[parent] == 0
+                elif kind is Or:
+                    count[parent] += 1 if changed else -1
+                    new = count[parent] > 0
+                elif kind is Not:
+                    new = not changed
+                elif kind is Implication:
+                    antecedent, consequent = children[parent]
+                    new = not value[antecedent] or value[consequent]
+                else:
+                    left, right = children[parent]
+                    new = value[left] == value[right]
+                if new != value[parent]:
+                    value[parent] = new
+                    changes.append((parent, new))
+
+
+# Models enumerated by a shard between checks for another shard's counterexample
+STOP_CHECK_INTERVAL = 4096
+
+# Per-process state of a model_check_parallel worker
+shard_worker = dict()
+
+
+def model_check_parallel(knowledge, query, processes=None, shard_symbols=None):
+    """
+    Checks if knowledge base entails query by enumerating all models
+    across a pool of processes.
+
+    Fixing the first `shard_symbols` symbols splits the models into
+    2^shard_symbols shards (by default about four per process). Each
+    worker receives the sentences once and compiles them; as soon as any
+    shard finds a counterexample every other worker stops.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    processes = processes or os.cpu_count() or 1
+    if shard_symbols is None:
+        shard_symbols = (processes * 4 - 1).bit_length()
+    shard_symbols = min(shard_symbols, len(symbols))
+
+    # Remaining shards return at once after a counterexample; the pool is
+    # drained rather than terminated, so no worker dies holding a lock
+    stop = multiprocessing.Event()
+    entailed = True
+    with multiprocessing.Pool(
+        processes, initializer=init_shard_worker,
+        initargs=(knowledge, query, symbols, shard_symbols, stop)
+    ) as pool:
+        for result, visited in pool.imap_unordered(
+            check_shard, range(1 << shard_symbols)
+        ):
+            STATISTICS["models"] += visited
+            if not result:
+                entailed = False
+                stop.set()
+        pool.close()
+        pool.join()
+    return entailed
+
+
+def init_shard_worker(knowledge, query, symbols, shard_symbols, stop):
+    """Compiles the sentences once in a model_check_parallel worker."""
+    shard_worker["knowledge"] = knowledge.compile(symbols)
+    shard_worker["query"] = query.compile(symbols)
+    shard_worker["free"] = len(symbols) - shard_symbols
+    shard_worker["fixed"] = shard_symbols
+    shard_worker["stop"] = stop
+
+
+def check_shard(shard):
+    """
+    Checks entailment in every model whose first symbols are given by
+    the bits of `shard`. Returns whether no counterexample was found,
+    and the number of models visited.
+    """
+    knowledge_holds = shard_worker["knowledge"]
+    query_holds = shard_worker["query"]
+    stop = shard_worker["stop"]
+    prefix = tuple(bool(shard >> i & 1) for i in range(shard_worker["fixed"]))
+    models = itertools.product((True, False), repeat=shard_worker["free"])
+    for i, rest in enumerate(models):
+        if i % STOP_CHECK_INTERVAL == 0 and stop.is_set():
+            return True, i
+        model = prefix + rest
+        if knowledge_holds(model) and not query_holds(model):
+            stop.set()
+            return False, i + 1
+    return True, 1 << shard_worker["free"]
+
+
+def model_check_partial(knowledge, query):
+    """
+    Checks if knowledge base entails query by enumerating models,
+    evaluating both sentences on every partial model so that a branch
+    is cut as soon as its outcome is decided.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    model = dict()
+
+    def check_all(index):
+        """Checks entailment in every extension of the partial model."""
+        STATISTICS["models"] += 1
+
+        # Vacuously entailed where the knowledge base is already false
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return True
+
+        # Entailed where the query is already true
+        holds = query.evaluate_partial(model)
+        if holds is True:
+            return True
+
+        # A counterexample once the knowledge base holds without the query
+        if known is True and holds is False:
+            return False
+
+        p = symbols[index]
+        for value in (True, False):
+            model[p] = value
+            if not check_all(index + 1):
+                del model[p]
+                return False
+        del model[p]
+        return True
+
+    return check_all(0)
+
+
+def model_check_dpll(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing that
+    knowledge ∧ ¬query has no model.
+    """
+    # Encode the query in a copy, keeping the cached clauses to the knowledge base
+    cnf = knowledge.cnf().copy()
+    negated = -cnf.literal(query)
+    solver = DPLL(cnf.clauses, cnf.num_variables)
+    entailed = solver.solve([negated]) is None
+    STATISTICS["decisions"] += solver.decisions
+    STATISTICS["conflicts"] += solver.learned
+    return entailed
+
+
+ENTAILED = "entailed"
+REFUTED = "refuted"
+UNKNOWN = "unknown"
+
+
+def model_check_many(knowledge, queries, backend="bitwise"):
+    """
+    Checks every query against the knowledge base in a single pass.
+
+    Returns a list with, for each query, ENTAILED if the knowledge base
+    entails it, REFUTED if it entails its negation and UNKNOWN
+    otherwise. `backend` is "bitwise", which enumerates the models of
+    the knowledge base once, or "dpll", which runs one solver session
+    and asks for each query under assumptions.
+    """
+    queries = list(queries)
+    if backend == "bitwise":
+        return model_check_many_bitwise(knowledge, queries)
+    if backend == "dpll":
+        return model_check_many_dpll(knowledge, queries)
+    raise ValueError(f"unknown model_check_many backend {backend!r}")
+
+
+def model_check_many_bitwise(knowledge, queries):
+    """Checks every query against each chunk of models of the knowledge base."""
+    symbols = sorted(set.union(
+        knowledge.symbols(), *[query.symbols() for query in queries]
+    ))
+
+    # Whether some model of the knowledge base makes the query true / false
+    satisfied = [False] * len(queries)
+    falsified = [False] * len(queries)
+    for columns, mask in bit_chunks(symbols):
+        models = knowledge.evaluate_bits(columns, mask)
+        if not models:
+            continue
+        for i, query in enumerate(queries):
+            if satisfied[i] and falsified[i]:
+                continue
+            holds = query.evaluate_bits(columns, mask)
+            satisfied[i] = satisfied[i] or bool(models & holds)
+            falsified[i] = falsified[i] or bool(models & ~holds)
+
+    return [
+        ENTAILED if not falsified[i] else REFUTED if not satisfied[i] else UNKNOWN
+        for i in range(len(queries))
+    ]
+
+
+def model_check_many_dpll(knowledge, queries):
+    """Checks every query with one solver over the knowledge base's clauses."""
+    cnf = knowledge.cnf().copy()
+    literals = [cnf.literal(query) for query in queries]
+    solver = DPLL(cnf.clauses, cnf.num_variables)
+
+    # Every model found rules out entailment of whatever it falsifies
+    models = []
+
+    def consistent(literal):
+        """Returns whether some model of the knowledge base makes `literal` true."""
+        if any(model.get(abs(literal)) == (literal > 0) for model in models):
+            return True
+        model = solver.solve([literal])
+        if model is None:
+            return False
+        models.append(model)
+        return True
+
+    results = []
+    for literal in literals:
+        if not consistent(-literal):
+            results.append(ENTAILED)
+        elif not consistent(literal):
+            results.append(REFUTED)
+        else:
+            results.append(UNKNOWN)
+    return results
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that grows with add() and answers queries from one
+    persistent solver, so compiled clauses, learned clauses and decision
+    heuristics carry over from one query to the next instead of being
+    rebuilt from scratch.
+
+    Queries may take `assumptions`: sentences treated as true for that
+    query only.
+    """
+
+    def __init__(self, *sentences):
+        self.knowledge = And()
+        self.cnf = CNF()
+        self.solver = DPLL()
+        self.passed = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence known to be true."""
+        self.knowledge.add(sentence)
+        self.cnf.add(sentence)
+
+    def literals(self, sentences):
+        """
+        Returns a literal for each sentence, then passes every clause
+        compiled since the last call on to the solver.
+        """
+        literals = [self.cnf.literal(sentence) for sentence in sentences]
+        for clause in self.cnf.clauses[self.passed:]:
+            self.solver.add_clause(clause)
+        self.passed = len(self.cnf.clauses)
+        return literals
+
+    def consistent(self, assumptions=()):
+        """Returns whether the knowledge base and assumptions have a model."""
+        return self.solver.solve(self.literals(assumptions)) is not None
+
+    def model(self, assumptions=()):
+        """
+        Returns a model {symbol name: bool} of the knowledge base and
+        assumptions, or None if they have none.
+        """
+        assignment = self.solver.solve(self.literals(assumptions))
+        if assignment is None:
+            return None
+        return self.cnf.decode(assignment)
+
+    def entails(self, query, assumptions=()):
+        """Returns whether the knowledge base and assumptions entail query."""
+        *assumed, literal = self.literals(list(assumptions) + [query])
+        return self.solver.solve(assumed + [-literal]) is None
+
+    def check(self, query, assumptions=()):
+        """
+        Returns ENTAILED if the knowledge base and assumptions entail
+        query, REFUTED if they entail its negation, UNKNOWN otherwise.
+        """
+        *assumed, literal = self.literals(list(assumptions) + [query])
+        if self.solver.solve(assumed + [-literal]) is None:
+            return ENTAILED
+        if self.solver.solve(assumed + [literal]) is None:
+            return REFUTED
+        return UNKNOWN
+
+
+def count_models(knowledge):
+    """
+    Counts the models of the knowledge base over its symbols and, in the
+    same run, how many of those models make each symbol true.
+
+    Returns (count, {symbol name: count}); dividing a symbol's count by
+    the total gives the fraction of worlds consistent with the knowledge
+    base in which it holds.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    clauses = frozenset(frozenset(clause) for clause in cnf.clauses)
+    variables = frozenset(range(1, cnf.num_variables + 1))
+
+    # Auxiliary variables are fixed by the symbols, so they add no models
+    count, counts = ModelCounter().count(clauses, variables)
+    return count, {
+        name: counts[variable] for name, variable in cnf.variables.items()
+    }
+
+
+class ModelCounter():
+    """
+    Exact model counter (#SAT) over clauses of integer literals.
+
+    DPLL-style branching with unit propagation, where the clauses left
+    after each step are split into components sharing no variable and
+    counted independently. Component results are cached by their clause
+    set, and every result carries, per variable, the number of models in
+    which it is true.
+    """
+
+    def __init__(self):
+        self.cache = dict()
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of assignments to `variables` satisfying
+        `clauses`, and a dict with the number of them making each
+        variable true.
+        """
+        # An empty clause, such as one from Or(), is never satisfied
+        clauses, assigned = self.propagate(clauses)
+        if clauses is None or frozenset() in clauses:
+            return 0, {variable: 0 for variable in variables}
+
+        count = 1
+        counts = dict()
+        for component in self.components(clauses):
+            if component not in self.cache:
+                self.cache[component] = self.branch(component)
+            component_count, component_counts = self.cache[component]
+            for variable in counts:
+                counts[variable] *= component_count
+            for variable, true in component_counts.items():
+                counts[variable] = true * count
+            count *= component_count
+
+        # Unconstrained variables double the count, fixed ones copy it
+        occurring = {abs(literal) for clause in clauses for literal in clause}
+        free = variables - occurring - {abs(literal) for literal in assigned}
+        count <<= len(free)
+        for variable in counts:
+            counts[variable] <<= len(free)
+        for variable in free:
+            counts[variable] = count // 2
+        for literal in assigned:
+            if abs(literal) in variables:
+                counts[abs(literal)] = count if literal > 0 else 0
+        return count, counts
+
+    def branch(self, component):
+        """Counts the models of a connected set of clauses by splitting on a variable."""
+        variables = frozenset(
+            abs(literal) for clause in component for literal in clause
+        )
+        occurrences = dict()
+        for clause in component:
+            for literal in clause:
+                occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+        variable = max(occurrences, key=occurrences.get)
+
+        count = 0
+        counts = {other: 0 for other in variables}
+        for literal in (variable, -variable):
+            branch_count, branch_counts = self.count(
+                component | {frozenset([literal])}, variables
+            )
+            count += branch_count
+            for other, true in branch_counts.items():
+                counts[other] += true
+        return count, counts
+
+    def propagate(self, clauses):
+        """
+        Applies unit clauses until none is left. Returns the simplified
+        clauses (None on a conflict) and the literals made true.
+        """
+        assigned = set()
+        while True:
+            units = {next(iter(clause)) for clause in clauses if len(clause) == 1}
+            if not units:
+                return clauses, assigned
+            if any(-literal in units for literal in units):
+                return None, assigned
+            assigned |= units
+            simplified = set()
+            for clause in clauses:
+                if clause & units:
+                    continue
+                clause = frozenset(
+                    literal for literal in clause if -literal not in units
+                )
+                if not clause:
+                    return None, assigned
+                simplified.add(clause)
+            clauses = frozenset(simplified)
+
+    def components(self, clauses):
+        """Splits clauses into groups that share no variable."""
+        parent = dict()
+
+        def find(variable):
+            while parent.setdefault(variable, variable) != variable:
+                parent[variable] = parent[parent[variable]]
+                variable = parent[variable]
+            return variable
+
+        for clause in clauses:
+            first, *rest = [abs(literal) for literal in clause]
+            root = find(first)
+            for variable in rest:
+                parent[find(variable)] = root
+
+        groups = dict()
+        for clause in clauses:
+            root = find(abs(next(iter(clause))))
+            groups.setdefault(root, set()).add(clause)
+        return [frozenset(group) for group in groups.values()]
+
+
+class CNF():
+    """
+    Conjunctive normal form of logical sentences over integer literals.
+
+    Each symbol is numbered from 1 in order of first appearance. Compound
+    sub-sentences are named by auxiliary variables (Tseitin transform),
+    so the number of clauses grows linearly with the size of a sentence
+    instead of exponentially. Identical sub-sentences share one auxiliary
+    variable and duplicate clauses are dropped.
+    """
+
+    def __init__(self):
+        self.variables = dict()
+        self.names = [None]
+        self.clauses = []
+        self.definitions = dict()
+        self.seen = set()
+        self.true = None
+
+    @property
+    def num_variables(self):
+        return len(self.names) - 1
+
+    def copy(self):
+        """Returns a copy that clauses can be added to without changing this one."""
+        cnf = CNF()
+        cnf.variables = dict(self.variables)
+        cnf.names = list(self.names)
+        cnf.clauses = list(self.clauses)
+        cnf.definitions = dict(self.definitions)
+        cnf.seen = set(self.seen)
+        cnf.true = self.true
+        return cnf
+
+    def variable(self, name):
+        """Returns the variable numbering the symbol called `name`."""
+        if name not in self.variables:
+            self.variables[name] = len(self.names)
+            self.names.append(name)
+        return self.variables[name]
+
+    def auxiliary(self):
+        """Returns a new variable that stands for no symbol."""
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def decode(self, assignment):
+        """Maps a solver assignment back to a model over symbol names."""
+        return {
+            name: assignment.get(variable, False)
+            for name, variable in self.variables.items()
+        }
+
+    def add_clause(self, literals):
+        """Adds a clause unless it is a tautology or already present."""
+        clause = frozenset(literals)
+        if clause in self.seen or any(-literal in clause for literal in clause):
+            return
+        self.seen.add(clause)
+        self.clauses.append(list(clause))
+
+    def add(self, sentence):
+        """Adds clauses asserting that `sentence` is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.add_clause([-self.literal(sentence.antecedent),
+                             self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            self.add_clause([-left, right])
+            self.add_clause([left, -right])
+        elif isinstance(sentence, Not):
+            operand = sentence.operand
+            if isinstance(operand, Not):
+                self.add(operand.operand)
+            elif isinstance(operand, Or):
+                for disjunct in operand.disjuncts:
+                    self.add(Not(disjunct))
+            elif isinstance(operand, Implication):
+                self.add(operand.antecedent)
+                self.add(Not(operand.consequent))
+            else:
+                self.add_clause([-self.literal(operand)])
+        else:
+            self.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding clauses that
+        define any auxiliary variable it needs.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if isinstance(sentence, (And, Or)):
+            operands = (sentence.conjuncts if isinstance(sentence, And)
+                        else sentence.disjuncts)
+            if len(operands) == 1:
+                return self.literal(operands[0])
+
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            defined = self.define_and(
+                [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            )
+        elif isinstance(sentence, Or):
+            defined = -self.define_and(
+                [-self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            defined = -self.define_and([self.literal(sentence.antecedent),
+                                        -self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            defined = self.auxiliary()
+            self.add_clause([-defined, -left, right])
+            self.add_clause([-defined, left, -right])
+            self.add_clause([defined, left, right])
+            self.add_clause([defined, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.definitions[sentence] = defined
+        return defined
+
+    def define_and(self, literals):
+        """Returns a variable equivalent to the conjunction of `literals`."""
+        if not literals:
+            if self.true is None:
+                self.true = self.auxiliary()
+                self.add_clause([self.true])
+            return self.true
+        defined = self.auxiliary()
+        for literal in literals:
+            self.add_clause([-defined, literal])
+        self.add_clause([defined] + [-literal for literal in literals])
+        return defined
+
+
+class DPLL():
+    """
+    DPLL satisfiability solver over clauses of integer literals.
+
+    Variables are numbered from 1; literal v asserts variable v and -v
+    its negation. Unit propagation uses two watched literals per clause,
+    so only clauses watching a literal that just became false are
+    visited. Pure literals are fixed before the search starts.
+
+    Each conflict is analysed back to its first unique implication point
+    and the resulting clause is learned, so the search jumps back past
+    decisions that played no part in it. Learned clauses, along with the
+    variable activities that steer decisions, are kept between calls to
+    solve(), which makes repeated queries under different assumptions
+    cheaper than the first.
+    """
+
+    def __init__(self, clauses=(), num_variables=0):
+        self.num_variables = num_variables
+        self.clauses = []
+        self.units = []
+        self.watches = dict()
+        self.activity = dict()
+        self.contradiction = False
+        self.learned = 0
+        self.decisions = 0
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, clause):
+        """Adds a clause, given as an iterable of literals."""
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return
+        for literal in clause:
+            self.num_variables = max(self.num_variables, abs(literal))
+        if not clause:
+            self.contradiction = True
+        elif len(clause) == 1:
+            self.units.append(clause[0])
+        else:
+            self.clauses.append(clause)
+            self.watches.setdefault(clause[0], []).append(clause)
+            self.watches.setdefault(clause[1], []).append(clause)
+
+    def solve(self, assumptions=()):
+        """
+        Returns a satisfying assignment {variable: bool} in which every
+        literal of `assumptions` holds, or None if there is none.
+        """
+        self.true = set()
+        self.trail = []
+        self.levels = []
+        self.level = dict()
+        self.reason = dict()
+        self.head = 0
+        if self.contradiction:
+            return None
+
+        # Literals forced regardless of any decision
+        for literal in self.units:
+            if not self.assign(literal, None):
+                self.contradiction = True
+                return None
+        for literal in self.pure_literals(assumptions):
+            self.assign(literal, None)
+
+        assumptions = list(assumptions)
+        for literal in assumptions:
+            self.num_variables = max(self.num_variables, abs(literal))
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.levels:
+                    self.contradiction = True
+                    return None
+                clause, level = self.analyze(conflict)
+                self.backtrack(level)
+                self.learn(clause)
+                continue
+
+            # Assumptions each take the next decision level
+            if len(self.levels) < len(assumptions):
+                literal = assumptions[len(self.levels)]
+                if -literal in self.true:
+                    return None
+                self.levels.append(len(self.trail))
+                if literal not in self.true:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.choose()
+            if variable is None:
+                return {
+                    variable: variable in self.true
+                    for variable in range(1, self.num_variables + 1)
+                }
+            self.decisions += 1
+            self.levels.append(len(self.trail))
+            self.assign(-variable, None)
+
+    def pure_literals(self, assumptions):
+        """Returns literals whose negation occurs in no clause."""
+        fixed = {abs(literal) for literal in assumptions}
+        occurring = set()
+        for clause in self.clauses:
+            occurring.update(clause)
+        return [
+            literal for literal in occurring
+            if -literal not in occurring and abs(literal) not in fixed
+        ]
+
+    def assign(self, literal, reason):
+        """
+        Makes `literal` true at the current decision level, implied by
+        the clause `reason` (None for decisions); returns False if it is
+        already false.
+        """
+        if -literal in self.true:
+            return False
+        if literal not in self.true:
+            self.true.add(literal)
+            self.trail.append(literal)
+            self.level[abs(literal)] = len(self.levels)
+            self.reason[abs(literal)] = reason
+        return True
+
+    def backtrack(self, level):
+        """Unassigns every literal above decision level `level`."""
+        if level >= len(self.levels):
+            return
+        position = self.levels[level]
+        for literal in self.trail[position:]:
+            self.true.discard(literal)
+        del self.trail[position:]
+        del self.levels[level:]
+        self.head = position
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from the conflicting clause, with its
+        asserting literal first, and the level to jump back to.
+        """
+        level = len(self.levels)
+        seen = set()
+        learned = []
+        pending = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail)
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.level[variable] > 0:
+                    seen.add(variable)
+                    self.activity[variable] = self.activity.get(variable, 0) + 1
+                    if self.level[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Walk back along the trail to the next literal involved
+            index -= 1
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            pending -= 1
+            if not pending:
+                break
+            clause = self.reason[abs(literal)]
+
+        learned.insert(0, -literal)
+        backjump = max((self.level[abs(other)] for other in learned[1:]), default=0)
+        return learned, backjump
+
+    def learn(self, clause):
+        """Adds a learned clause and asserts its first literal."""
+        self.learned += 1
+        if len(clause) == 1:
+            self.units.append(clause[0])
+            self.assign(clause[0], None)
+            return
+
+        # Watch the asserting literal and the one assigned last
+        last = max(range(1, len(clause)), key=lambda i: self.level[abs(clause[i])])
+        clause[1], clause[last] = clause[last], clause[1]
+        self.clauses.append(clause)
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+        self.assign(clause[0], clause)
+
+    def choose(self):
+        """Returns the most active unassigned variable, or None if all are assigned."""
+        true = self.true
+        activity = self.activity
+        chosen = None
+        best = -1
+        for variable in range(1, self.num_variables + 1):
+            if variable not in true and -variable not in true:
+                score = activity.get(variable, 0)
+                if score > best:
+                    chosen, best = variable, score
+        return chosen
+
+    def propagate(self):
+        """
+        Performs unit propagation over the watched literals; returns a
+        clause whose literals are all false, or None if there is none.
+        """
+        true = self.true
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches.get(false, [])
+            kept = []
+            for index, clause in enumerate(watching):
+
+                # Keep the falsified watch in the second position
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                other = clause[0]
+                if other in true:
+                    kept.append(clause)
+                    continue
+
+                # Look for a replacement watch that is not false
+                for position in range(2, len(clause)):
+                    literal = clause[position]
+                    if -literal not in true:
+                        clause[1], clause[position] = literal, false
+                        self.watches.setdefault(literal, []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if not self.assign(other, clause):
+                        kept.extend(watching[index + 1:])
+                        self.watches[false] = kept
+                        return clause
+            self.watches[false] = kept
+        return None
+
+
+def model_check_bdd(knowledge, query):
+    """
+    Checks if knowledge base entails query by compiling the knowledge
+    base to a binary decision diagram.
+    """
+    bdd = BDD.compile(knowledge)
+    entailed = bdd.entails(query)
+    STATISTICS["nodes"] += len(bdd.nodes)
+    return entailed
+
+
+def appearance_order(sentence):
+    """Orders symbols by their first appearance in the sentence."""
+    order = dict()
+
+    def visit(sentence):
+        if isinstance(sentence, Symbol):
+            order.setdefault(sentence.name, len(order))
+        for child in operands(sentence):
+            visit(child)
+
+    visit(sentence)
+    return list(order)
+
+
+def occurrence_order(sentence):
+    """Orders symbols from the most to the least often mentioned."""
+    occurrences = dict()
+
+    def visit(sentence):
+        if isinstance(sentence, Symbol):
+            occurrences[sentence.name] = occurrences.get(sentence.name, 0) + 1
+        for child in operands(sentence):
+            visit(child)
+
+    visit(sentence)
+    return sorted(occurrences, key=lambda name: (-occurrences[name], name))
+
+
+def operands(sentence):
+    """Returns the sentences a logical sentence is built from."""
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    return []
+
+
+BDD_ORDERINGS = {
+    "appearance": appearance_order,
+    "occurrence": occurrence_order,
+    "sorted": lambda sentence: sorted(sentence.symbols()),
+}
+
+
+class BDD():
+    """
+    Reduced ordered binary decision diagram of a logical sentence.
+
+    Nodes are ints: 0 and 1 are the false and true terminals, and every
+    other node tests the symbol at its level, with a low (false) and a
+    high (true) child. A unique table keeps one node per (level, low,
+    high), so equivalent functions share a node, and if-then-else
+    results are kept in an operation cache. Once compiled, entailment,
+    model counting and forced symbols are single passes over the nodes.
+    Queries build their nodes in scratch space that is discarded after,
+    so the compiled diagram does not change as it is queried.
+    """
+
+    def __init__(self, order=()):
+        self.order = []
+        self.levels = dict()
+        self.nodes = [(float("inf"), 0, 0), (float("inf"), 1, 1)]
+        self.unique = dict()
+        self.cache = dict()
+        self.root = 1
+        for name in order:
+            self.level(name)
+
+    @classmethod
+    def compile(cls, sentence, ordering="appearance"):
+        """
+        Compiles a sentence. `ordering` is the name of a heuristic in
+        BDD_ORDERINGS or an explicit list of symbol names.
+        """
+        if isinstance(ordering, str):
+            try:
+                ordering = BDD_ORDERINGS[ordering](sentence)
+            except KeyError:
+                raise ValueError(f"unknown BDD ordering {ordering!r}")
+        bdd = cls(ordering)
+        bdd.root = bdd.build(sentence)
+        bdd.cache.clear()
+        return bdd
+
+    @classmethod
+    def load(cls, path):
+        """Reads a diagram written by save()."""
+        with open(path) as f:
+            data = json.load(f)
+        bdd = cls(data["order"])
+        for level, low, high in data["nodes"]:
+            bdd.node(level, low, high)
+        bdd.root = data["root"]
+        return bdd
+
+    def save(self, path):
+        """
+        Writes the symbol order and the nodes reachable from the root to
+        `path` as JSON, numbered so that children precede their parents.
+        """
+        number = {0: 0, 1: 1}
+        nodes = []
+        stack = [self.root]
+        while stack:
+            u = stack[-1]
+            if u in number:
+                stack.pop()
+                continue
+            _, low, high = self.nodes[u]
+            children = [child for child in (low, high) if child not in number]
+            if children:
+                stack.extend(children)
+                continue
+            stack.pop()
+            level, low, high = self.nodes[u]
+            number[u] = len(nodes) + 2
+            nodes.append([level, number[low], number[high]])
+        with open(path, "w") as f:
+            json.dump({
+                "order": self.order,
+                "nodes": nodes,
+                "root": number[self.root],
+            }, f)
+
+    def discard(self, nodes, symbols):
+        """
+        Removes every node and symbol added after the first `nodes` nodes
+        and `symbols` symbols, along with the operation cache.
+        """
+        for key in self.nodes[nodes:]:
+            del self.unique[key]
+        del self.nodes[nodes:]
+        for name in self.order[symbols:]:
+            del self.levels[name]
+        del self.order[symbols:]
+        self.cache.clear()
+
+    def level(self, name):
+        """Returns the level testing symbol `name`, adding it below the others if new."""
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.levels[name]
+
+    def node(self, level, low, high):
+        """Returns the node testing `level`, reusing an identical one."""
+        if low == high:
+            return low
+        key = (level, low, high)
+        if key not in self.unique:
+            self.unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.unique[key]
+
+    def ite(self, f, g, h):
+        """Returns the node for "if f then g else h"."""
+        if f == 1:
+            return g
+        if f == 0:
+            return h
+        if g == h:
+            return g
+        if g == 1 and h == 0:
+            return f
+        key = (f, g, h)
+        if key in self.cache:
+            return self.cache[key]
+
+        level = min(self.nodes[f][0], self.nodes[g][0], self.nodes[h][0])
+        low = self.ite(*[self.cofactor(u, level, False) for u in (f, g, h)])
+        high = self.ite(*[self.cofactor(u, level, True) for u in (f, g, h)])
+        result = self.node(level, low, high)
+        self.cache[key] = result
+        return result
+
+    def cofactor(self, u, level, value):
+        """Returns node `u` with the symbol at `level` set to `value`."""
+        node_level, low, high = self.nodes[u]
+        if node_level != level:
+            return u
+        return high if value else low
+
+    def build(self, sentence):
+        """Returns the node for a sentence."""
+        if isinstance(sentence, Symbol):
+            return self.node(self.level(sentence.name), 0, 1)
+        if isinstance(sentence, Not):
+            return self.ite(self.build(sentence.operand), 0, 1)
+        if isinstance(sentence, And):
+            result = 1
+            for conjunct in sentence.conjuncts:
+                result = self.ite(result, self.build(conjunct), 0)
+            return result
+        if isinstance(sentence, Or):
+            result = 0
+            for disjunct in sentence.disjuncts:
+                result = self.ite(result, 1, self.build(disjunct))
+            return result
+        if isinstance(sentence, Implication):
+            antecedent = self.build(sentence.antecedent)
+            return self.ite(antecedent, self.build(sentence.consequent), 1)
+        if isinstance(sentence, Biconditional):
+            left = self.build(sentence.left)
+            right = self.build(sentence.right)
+            return self.ite(left, right, self.ite(right, 0, 1))
+        raise TypeError("must be a logical sentence")
+
+    def entails(self, query):
+        """Returns whether the compiled sentence entails query."""
+        nodes, symbols = len(self.nodes), len(self.order)
+        try:
+            return self.ite(self.root, self.build(query), 1) == 1
+        finally:
+            self.discard(nodes, symbols)
+
+    def count(self):
+        """Returns the number of models over all symbols in the order."""
+        levels = len(self.order)
+        models = {0: 0, 1: 1}
+
+        def count(u):
+            """Models of `u` over the symbols from its level down."""
+            if u not in models:
+                level, low, high = self.nodes[u]
+                models[u] = sum(
+                    count(child) << (min(self.nodes[child][0], levels) - level - 1)
+                    for child in (low, high)
+                )
+            return models[u]
+
+        return count(self.root) << min(self.nodes[self.root][0], levels)
+
+    def forced(self):
+        """
+        Returns {symbol name: value} for every symbol taking the same
+        value in all models of the compiled sentence.
+        """
+        forced = dict()
+        if self.root == 0:
+            return forced
+        nodes = len(self.nodes)
+        for name, level in self.levels.items():
+            variable = self.node(level, 0, 1)
+            if self.ite(self.root, variable, 0) == 0:
+                forced[name] = False
+            elif self.ite(variable, 0, self.root) == 0:
+                forced[name] = True
+        self.discard(nodes, len(self.order))
+        return forced
+
+
+MODEL_CHECK_BACKENDS = {
+    "truth_table": model_check_truth_table,
+    "compiled": model_check_compiled,
+    "bitwise": model_check_bitwise,
+    "parallel": model_check_parallel,
+    "gray": model_check_gray,
+    "partial": model_check_partial,
+    "dpll": model_check_dpll,
+    "bdd": model_check_bdd,
+}
@@ -0,0 +1,95 @@
+import pickle
+import unittest
+
+from logic import *
+
+A = Symbol("A")
+B = Symbol("B")
+C = Symbol("C")
+
+
+class NestedAddTest(unittest.TestCase):
+
+    def test_symbols_after_nested_add(self):
+        base = And(A)
+        knowledge = And(base)
+        knowledge.symbols()
+        base.add(Or(B, C))
+        self.assertEqual(knowledge.symbols(), {"A", "B", "C"})
+        for backend in MODEL_CHECK_BACKENDS:
+            self.assertTrue(model_check(knowledge, A, backend), backend)
+
+    def test_answers_after_nested_add(self):
+        base = And(Or(A, B))
+        knowledge = And(base)
+        for backend in MODEL_CHECK_BACKENDS:
+            self.assertFalse(model_check(knowledge, A, backend), backend)
+        base.add(A)
+        for backend in MODEL_CHECK_BACKENDS:
+            self.assertTrue(model_check(knowledge, A, backend), backend)
+
+    def test_hash_after_nested_add(self):
+        base = And(A)
+        knowledge = Not(base)
+        hash(knowledge)
+        base.add(B)
+        self.assertEqual(hash(knowledge), hash(Not(And(A, B))))
+
+    def test_add_after_unpickling(self):
+        knowledge = pickle.loads(pickle.dumps(Not(And(A))))
+        hash(knowledge)
+        knowledge.symbols()
+        knowledge.operand.add(B)
+        self.assertEqual(hash(knowledge), hash(Not(And(A, B))))
+        self.assertEqual(knowledge.symbols(), {"A", "B"})
+
+
+class CompileTest(unittest.TestCase):
+
+    def test_deeply_nested_sentence(self):
+        sentence = A
+        for i in range(300):
+            sentence = Not(sentence) if i % 2 else Implication(B, sentence)
+        knowledge = And(sentence, B)
+        expected = model_check(knowledge, A, "truth_table")
+        self.assertEqual(model_check(knowledge, A), expected)
+        self.assertTrue(model_check(knowledge, B))
+        self.assertTrue(model_check(And(knowledge, A), A))
+
+
+class BDDTest(unittest.TestCase):
+
+    def test_queries_leave_diagram_unchanged(self):
+        bdd = BDD.compile(And(A, Or(A, B)))
+        nodes = len(bdd.nodes)
+        self.assertEqual(bdd.count(), 2)
+        self.assertFalse(bdd.entails(C))
+        self.assertTrue(bdd.entails(A))
+        self.assertEqual(bdd.forced(), {"A": True})
+        self.assertEqual(bdd.count(), 2)
+        self.assertEqual(bdd.order, ["A", "B"])
+        self.assertEqual(len(bdd.nodes), nodes)
+
+
+class CountModelsTest(unittest.TestCase):
+
+    def test_empty_clause(self):
+        self.assertEqual(count_models(Or()), (0, {}))
+        self.assertEqual(count_models(And(A, Or())), (0, {"A": 0}))
+        self.assertEqual(count_models(Or(A, B)), (3, {"A": 2, "B": 2}))
+
+
+class DPLLTest(unittest.TestCase):
+
+    def test_queries_leave_cached_clauses_unchanged(self):
+        knowledge = And(Or(A, B), Implication(A, C))
+        clauses = list(knowledge.cnf().clauses)
+        for query in [And(A, C), Or(B, C), Biconditional(A, B)]:
+            model_check(knowledge, query, "dpll")
+        model_check_many(knowledge, [And(B, C), Not(Or(A, C))], "dpll")
+        self.assertEqual(knowledge.cnf().clauses, clauses)
+        self.assertTrue(model_check(knowledge, Or(B, C), "dpll"))
+
+
+if __name__ == "__main__":
+    unittest.main()
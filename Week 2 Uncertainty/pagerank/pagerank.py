@@ -1,4 +1,8 @@
+import array
 import collections
+import math
+import multiprocessing
+import operator
 import os
 import random
 import re
@@ -7,19 +11,44 @@ import sys
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Iteration stops once the ranks change by less than this in total
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+# Independent walkers in parallel sampling, the rounds their samples are
+# split into, and the normal quantile of the confidence intervals
+WALKERS = 8
+ROUNDS = 20
+CONFIDENCE_Z = 1.96
+
+# Links of a corpus in compressed sparse row form: the pages linking to
+# pages[p] are numbered indices[indptr[p]:indptr[p + 1]]
+LinkMatrix = collections.namedtuple(
+    "LinkMatrix", ["pages", "indptr", "indices", "out_degree"]
+)
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank.py corpus [walkers]")
     corpus = crawl(sys.argv[1])
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
+    matrix = link_matrix(corpus)
+    ranks, iterations, residual = power_iteration(matrix, DAMPING)
+    print(f"PageRank Results from Iteration ({iterations} iterations, residual {residual:.1e})")
+    for page, rank in zip(matrix.pages, ranks):
+        print(f"  {page}: {rank:.4f}")
+    if len(sys.argv) == 3:
+        walkers = int(sys.argv[2])
+        ranks, errors, samples = parallel_sample_pagerank(
+            corpus, DAMPING, SAMPLES * walkers, walkers
+        )
+        print(f"PageRank Results from {walkers} Walkers (n = {samples}, 95% intervals)")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f} +/- {errors[page]:.4f}")
 
 
 def crawl(directory):
@@ -86,11 +115,10 @@ def transition_model(corpus, page, damping_factor):
             probability_distribution[page] = 1 / len(pages_in_corpus)
         return probability_distribution
 
-    average_random_damping_factor = round((1 - damping_factor) / (number_linked_pages_in_page + 1), 3)
-    probability_distribution[page] = average_random_damping_factor
+    for corpus_page in corpus:
+        probability_distribution[corpus_page] = (1 - damping_factor) / len(corpus)
     for linked_page in linked_pages_in_page:
-        probability_distribution[linked_page] = round((damping_factor / number_linked_pages_in_page)
-                                                      + average_random_damping_factor, 3)
+        probability_distribution[linked_page] += damping_factor / number_linked_pages_in_page
 
     return probability_distribution
 
@@ -116,17 +144,140 @@ def sample_pagerank(corpus, damping_factor, n):
     # For example, if the transition probabilities are {"1.html": 0.05, "2.html": 0.475, "3.html": 0.475}, then 5% of the time the next sample generated should be "1.html", 47.5% of the time the next sample generated should be "2.html", and 47.5% of the time the next sample generated should be "3.html".
     # You may assume that n will be at least 1.
 
-    page = random.choice(list(corpus.keys()))
-    page_rank = collections.defaultdict(int)
-    for i in range(n):
-        probability_distribution = transition_model(corpus, page, damping_factor)
-        # Choose a random element from the list with the specified probabilities
-        new_page = random.choices(list(probability_distribution.keys()),
-                                  weights=list(probability_distribution.values()), k=1)
-        page_rank[new_page[0]] += 1 / n
-        page = new_page[0]
+    # Each step of the transition model either follows one of the page's
+    # links or jumps to any page, both uniformly, so a step needs only a
+    # random number or two and the page's links in link_lists form
+    pages, indptr, indices = link_lists(corpus)
+    page = random.randrange(len(pages))
+    visits, _ = surf(indptr, indices, damping_factor, page, n, random.random)
+    return {page: visits[p] / n for p, page in enumerate(pages)}
+
+
+def surf(indptr, indices, damping_factor, page, n, rand):
+    """
+    Return the number of visits to each page over `n` samples, starting
+    at `page` and drawing random numbers from `rand`, and the page the
+    next sample would visit.
+    """
+    count = len(indptr) - 1
+    visits = [0] * count
+    for _ in range(n):
+        visits[page] += 1
+        start = indptr[page]
+        degree = indptr[page + 1] - start
+        chance = rand()
+        if degree and chance < damping_factor:
+            page = indices[start + int(chance / damping_factor * degree)]
+        else:
+            page = int(rand() * count)
+    return visits, page
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, walkers=WALKERS,
+                             seed=None, tolerance=None, processes=None):
+    """
+    Return PageRank values for each page by sampling about `n` pages
+    with independent random surfers across a pool of processes, along
+    with the half-width of a confidence interval for each value and the
+    number of samples taken.
+
+    Each walker draws from its own random stream, seeded from `seed`.
+    Samples are taken in ROUNDS rounds, and each walker's visits in each
+    round are one batch in a batch means estimate of the intervals.
+    Given a `tolerance`, sampling stops after the first round in which
+    every half-width is below it.
+    """
+    pages, indptr, indices = link_lists(corpus)
+    count = len(pages)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    streams = [random.Random(f"{seed}/{walker}") for walker in range(walkers)]
+    tasks = [
+        (stream.randrange(count), stream.getstate()) for stream in streams
+    ]
+    steps = max(1, math.ceil(n / (walkers * ROUNDS)))
+
+    # Sums, and sums of squares, of each page's share of each batch
+    visits = [0] * count
+    shares = [0.0] * count
+    squares = [0.0] * count
+    batches = 0
+    errors = [math.inf] * count
+
+    with multiprocessing.Pool(
+        processes, initializer=init_walker,
+        initargs=(indptr, indices, damping_factor)
+    ) as pool:
+        for _ in range(ROUNDS):
+            results = pool.map(walk, [task + (steps,) for task in tasks])
+            tasks = []
+            for batch, page, state in results:
+                visits = list(map(operator.add, visits, batch))
+                share = [visit / steps for visit in batch]
+                shares = list(map(operator.add, shares, share))
+                squares = list(map(operator.add, squares, map(operator.mul, share, share)))
+                tasks.append((page, state))
+            batches += walkers
+
+            # Standard error of the mean share, from the variance between batches
+            if batches > 1:
+                errors = [
+                    CONFIDENCE_Z * math.sqrt(
+                        max(0.0, (total_square - total * total / batches) / (batches - 1))
+                        / batches
+                    )
+                    for total, total_square in zip(shares, squares)
+                ]
+            if tolerance is not None and max(errors) < tolerance:
+                break
+
+    samples = batches * steps
+    ranks = {page: visits[p] / samples for p, page in enumerate(pages)}
+    return ranks, dict(zip(pages, errors)), samples
+
+
+# Each pool process's copy of the corpus links, set by init_walker
+walker_links = dict()
+
+
+def init_walker(indptr, indices, damping_factor):
+    """
+    Stores the corpus links and damping factor in a pool process.
+    """
+    walker_links["indptr"] = indptr
+    walker_links["indices"] = indices
+    walker_links["damping_factor"] = damping_factor
+
+
+def walk(task):
+    """
+    Continues a walker, given its (page, random state, samples), and
+    returns its visits to each page, next page and random state.
+    """
+    page, state, n = task
+    stream = random.Random()
+    stream.setstate(state)
+    visits, page = surf(
+        walker_links["indptr"], walker_links["indices"],
+        walker_links["damping_factor"], page, n, stream.random
+    )
+    return visits, page, stream.getstate()
 
-    return page_rank
+
+def link_lists(corpus):
+    """
+    Return the pages of a corpus in sorted order, along with arrays in
+    compressed sparse row form where the pages linked to by pages[p] are
+    numbered indices[indptr[p]:indptr[p + 1]].
+    """
+    pages = sorted(corpus)
+    number = {page: n for n, page in enumerate(pages)}
+    indptr = array.array("q", [0])
+    indices = array.array("q")
+    for page in pages:
+        indices.extend(sorted(number[link] for link in corpus[page]))
+        indptr.append(len(indices))
+    return pages, indptr, indices
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -138,51 +289,66 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # start by assuming the PageRank of every page is 1 / N
-
-    page_rank = collections.defaultdict(int)
-    # start by assuming the PageRank of every page is 1 / N
-    init_page_rank_value = 1 / len(corpus)
-    reach_min_changes_value = False
-
-    for page in list(corpus.keys()):
-        page_rank[page] = init_page_rank_value
-
-    while not reach_min_changes_value:
-        # new PageRank values for each page, based on the previous PageRank values.
-        # {'4.html': {'2.html'}, '3.html': {'2.html', '4.html'}, '2.html': {'1.html', '3.html'}, '1.html': {'2.html'}}
-        current_page_rank = page_rank.copy()
-        for page in list(corpus.keys()):
-            # PageRank formula
-            # 1 - d divided by N, where N is the total number of pages across the entire corpus.
-            new_page_rank_value = (1 - damping_factor) / len(corpus)
-            for i in list(corpus.keys()):
-                # consider each possible page i that links to page p
-                if page in corpus[i]:
-                    # PR(i), representing the probability that we are on page i at any given time.
-                    # NumLinks(i) be the number of links on page i
-                    new_page_rank_value += damping_factor * (page_rank[i] / len(corpus[i]))
-                elif len(corpus[i]) == 0:
-                    new_page_rank_value += damping_factor * (page_rank[i] / len(corpus))
-                # A page that has no links at all should be interpreted as having one link for every page in the corpus (including itself).
-            current_page_rank[page] = round(new_page_rank_value, 5)
-
-        # Repeat until no PageRank value changes by more than 0.001 between the current rank values and the new rank values.
-        diff_list = []
-        for page in list(corpus.keys()):
-            diff_list.append(abs(current_page_rank[page] - page_rank[page]))
-            page_rank[page] = current_page_rank[page]
-        if check_all_value_is_less_than_value(diff_list, 0.0001):
-            reach_min_changes_value = True
-
-    return page_rank
-
-
-def check_all_value_is_less_than_value(diff_list, min_value):
-    for diff in diff_list:
-        if diff > min_value:
-            return False
-    return True
+    matrix = link_matrix(corpus)
+    ranks, _, _ = power_iteration(matrix, damping_factor)
+    return dict(zip(matrix.pages, ranks))
+
+
+def link_matrix(corpus):
+    """
+    Return the LinkMatrix of a corpus, with pages in sorted order.
+    """
+    pages = sorted(corpus)
+    number = {page: n for n, page in enumerate(pages)}
+    linked_from = [[] for _ in pages]
+    for page in pages:
+        for link in corpus[page]:
+            linked_from[number[link]].append(number[page])
+
+    indptr = array.array("q", [0])
+    indices = array.array("q")
+    for links in linked_from:
+        indices.extend(links)
+        indptr.append(len(indices))
+    out_degree = array.array("q", (len(corpus[page]) for page in pages))
+    return LinkMatrix(pages, indptr, indices, out_degree)
+
+
+def power_iteration(matrix, damping_factor, tolerance=TOLERANCE):
+    """
+    Return the PageRank of each page of a LinkMatrix, in order, along
+    with the number of iterations taken and the L1 norm of the last
+    change in PageRank, once that falls below `tolerance`.
+
+    A page that has no links at all is interpreted as having one link
+    for every page in the corpus (including itself).
+    """
+    n = len(matrix.pages)
+    ranks = [1 / n] * n
+    inverse = [1 / degree if degree else 0.0 for degree in matrix.out_degree]
+    dangling = [page for page, degree in enumerate(matrix.out_degree) if not degree]
+    indptr, indices = matrix.indptr, matrix.indices
+
+    residual = float("inf")
+    iterations = 0
+    while residual >= tolerance and iterations < MAX_ITERATIONS:
+        iterations += 1
+
+        # Rank each page passes along each of its links
+        shares = list(map(operator.mul, ranks, inverse))
+        get = shares.__getitem__
+
+        # Chance of a random jump, or of following a dangling page
+        base = ((1 - damping_factor) + damping_factor * sum(map(ranks.__getitem__, dangling))) / n
+
+        new_ranks = [
+            base + damping_factor * sum(map(get, indices[indptr[page]:indptr[page + 1]]))
+            for page in range(n)
+        ]
+        residual = sum(map(abs, map(operator.sub, new_ranks, ranks)))
+        ranks = new_ranks
+
+    return ranks, iterations, residual
 
 
 if __name__ == "__main__":